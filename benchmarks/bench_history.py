@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the command history index.
+
+Fills a HistoryIndex with synthetic entries and times prefix lookups,
+full-text searches and "repeat N" recency lookups.
+
+    python benchmarks/bench_history.py [--entries 100000] [--rounds 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vocalshell.history import HistoryIndex  # noqa: E402
+
+TEMPLATES = [
+    ("list files in {w}", "ls {w}"),
+    ("go to {w}", "cd {w}"),
+    ("ping {w}.com", "ping -c 4 {w}.com"),
+    ("delete file {w}.log", "rm -f {w}.log"),
+    ("copy file {w} to backup", "cp {w} backup"),
+    ("git clone {w}", "git clone {w}"),
+]
+
+
+def timed(func, queries, rounds):
+    start = time.perf_counter()
+    for i in range(rounds):
+        func(queries[i % len(queries)])
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--entries", type=int, default=100000)
+    ap.add_argument("--rounds", type=int, default=2000)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    words = [f"{rng.choice(['logs', 'report', 'server', 'photo', 'build', 'data'])}{n}" for n in range(5000)]
+
+    index = HistoryIndex(max_entries=args.entries)
+    start = time.perf_counter()
+    for i in range(1, args.entries + 1):
+        original, command = rng.choice(TEMPLATES)
+        w = rng.choice(words)
+        index.add({
+            "id": i,
+            "original": original.format(w=w),
+            "command": command.format(w=w),
+            "timestamp": "2026-01-01 00:00:00",
+        })
+    build = time.perf_counter() - start
+
+    prefixes = ["lo", "rep", "serv", "photo1", "bu", "data42"]
+    searches = ["ping server12", "logs", "delete photo", "copy data3", "git clone build"]
+
+    print(f"entries:          {len(index)}")
+    print(f"index build:      {build:8.2f} s")
+    print(f"prefix lookup:    {timed(lambda p: index.prefix(p, 20), prefixes, args.rounds) * 1e6:8.1f} us")
+    print(f"search (limit 1): {timed(lambda q: index.search(q, 1), searches, args.rounds) * 1e6:8.1f} us")
+    print(f"search (limit 20):{timed(lambda q: index.search(q, 20), searches, args.rounds) * 1e6:8.1f} us")
+    print(f"repeat N:         {timed(lambda n: index.recent(n), [1, 5, 50, 500], args.rounds) * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for utterance normalization.
+
+Compares TextNormalizer (one literal-led, word-bounded pattern per filler)
+against the old loop of one str.replace per filler phrase, on a typical
+short command and on long dictated input.
+
+    python benchmarks/bench_normalize.py [--words 2000] [--rounds 200]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vocalshell.normalizer import DEFAULT_FILLER_WORDS, TextNormalizer  # noqa: E402
+
+SHORT = "Could you please list files in downloads"
+
+VOCABULARY = [
+    "please", "could", "you", "just", "justify", "list", "files", "in", "the",
+    "downloads", "folder", "kindly", "copy", "report", "to", "backup", "and",
+    "then", "i", "want", "to", "see", "system", "info", "can", "you", "show",
+]
+
+
+def legacy_normalize(text):
+    text = text.lower().strip()
+    for filler in DEFAULT_FILLER_WORDS:
+        text = text.replace(filler, "")
+    text = re.sub(r'\.(txt|csv|log|py|md)$', '', text)
+    return text.strip()
+
+
+def timed(func, text, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(text)
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--words", type=int, default=2000)
+    ap.add_argument("--rounds", type=int, default=200)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    text = " ".join(rng.choice(VOCABULARY) for _ in range(args.words)) + " notes.txt"
+
+    normalizer = TextNormalizer()
+    with_numbers = TextNormalizer(["lowercase", "fillers", "numbers", "extension"])
+
+    for label, sample, rounds in (("short command", SHORT, args.rounds * 100), (f"{args.words} words", text, args.rounds)):
+        print(f"{label}:")
+        print(f"  TextNormalizer:      {timed(normalizer, sample, rounds) * 1e6:8.1f} us")
+        print(f"    with numbers step: {timed(with_numbers, sample, rounds) * 1e6:8.1f} us")
+        print(f"  legacy replace loop: {timed(legacy_normalize, sample, rounds) * 1e6:8.1f} us")
+    print(f"'justify' kept:      new={'justify' in normalizer(text)} legacy={'justify' in legacy_normalize(text)}")
+
+
+if __name__ == "__main__":
+    main()
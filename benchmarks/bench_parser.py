@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for NLPCommandParser.parse_command.
+
+Builds a synthetic command config with ~1,000 patterns (the real mappings
+plus generated categories) and compares the compiled grammar against the
+old linear scan of re.search + SequenceMatcher per pattern.
+
+    python benchmarks/bench_parser.py [--patterns 1000] [--rounds 200]
+"""
+
+import argparse
+import difflib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vocalshell.nlp_parser import NLPCommandParser  # noqa: E402
+
+CONFIG = os.path.join(os.path.dirname(__file__), "..", "config", "commands_config.json")
+
+VERBS = ["open", "start", "stop", "show", "list", "fetch", "build", "deploy", "check", "sync"]
+NOUNS = ["service", "cluster", "report", "backup", "volume", "queue", "bucket", "branch", "image", "table"]
+
+UTTERANCES = [
+    "list files",
+    "go to downloads",
+    "system info",
+    "copy file notes.txt to backup",
+    "show file readme page by page",
+    "deploy cluster alpha in region 2",
+    "check the weather tomorrow",
+    "lisst files",
+    "sistem info",
+]
+
+
+def build_config(n_patterns):
+    with open(CONFIG) as f:
+        data = json.load(f)
+    mappings = data["command_mappings"]
+    total = sum(len(m["patterns"]) for m in mappings.values())
+
+    i = 0
+    while total < n_patterns:
+        verb, noun = VERBS[i % len(VERBS)], NOUNS[(i // len(VERBS)) % len(NOUNS)]
+        suffix = i // (len(VERBS) * len(NOUNS))
+        mappings[f"synthetic_{i}"] = {
+            "patterns": [
+                f"{verb} {noun} (.*) in region {suffix}",
+                f"{verb} the {noun} (.*) number {suffix}",
+                f"please {verb} {noun} {suffix}",
+            ],
+            "windows_command": f"echo {verb} {noun} {{name}}",
+            "linux_command": f"echo {verb} {noun} {{name}}",
+            "description": "synthetic",
+            "dangerous": False,
+        }
+        total += 3
+        i += 1
+    return data, total
+
+
+def legacy_parse(mappings, text, threshold=0.7):
+    # The pre-grammar scan: first regex or fuzzy hit in insertion order wins
+    for category, mapping in mappings.items():
+        for pat in mapping.get("patterns", []):
+            if re.search(pat, text):
+                return category
+            if difflib.SequenceMatcher(None, text, pat).ratio() >= threshold:
+                return category
+    return None
+
+
+def timed(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in UTTERANCES:
+            func(text)
+    return (time.perf_counter() - start) / (rounds * len(UTTERANCES))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--patterns", type=int, default=1000)
+    ap.add_argument("--rounds", type=int, default=200)
+    args = ap.parse_args()
+
+    data, total = build_config(args.patterns)
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(data, f)
+        path = f.name
+    try:
+        start = time.perf_counter()
+        parser = NLPCommandParser(path, cache_size=0)
+        build = time.perf_counter() - start
+
+        grammar = timed(parser.parse_command, args.rounds)
+        cached = timed(NLPCommandParser(path).parse_command, args.rounds)
+        legacy = timed(lambda t: legacy_parse(data["command_mappings"], t), max(1, args.rounds // 20))
+    finally:
+        os.remove(path)
+
+    print(f"patterns:          {total}")
+    print(f"grammar build:     {build * 1e3:8.2f} ms")
+    print(f"compiled grammar:  {grammar * 1e6:8.1f} us/parse")
+    print(f"LRU cache hit:     {cached * 1e6:8.1f} us/parse")
+    print(f"legacy scan:       {legacy * 1e6:8.1f} us/parse")
+    print(f"speedup:           {legacy / grammar:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
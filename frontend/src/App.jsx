@@ -3,6 +3,15 @@ import "./terminal.css";
 
 const BACKEND_URL = "http://127.0.0.1:5000/process-text";
 
+// One server-side working directory per browser tab
+const SESSION_ID =
+  sessionStorage.getItem("vocalshell-session") ||
+  (() => {
+    const id = crypto.randomUUID();
+    sessionStorage.setItem("vocalshell-session", id);
+    return id;
+  })();
+
 export default function App() {
   const [listening, setListening] = useState(false);
   const [command, setCommand] = useState("");
@@ -93,7 +102,7 @@ export default function App() {
       const res = await fetch(BACKEND_URL, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ text }),
+        body: JSON.stringify({ text, session_id: SESSION_ID }),
       });
 
       if (!res.ok) {
@@ -1,47 +1,55 @@
 import os
-import urllib.request
-import zipfile
 import sys
-from pathlib import Path
-
-def download_vosk_model(model_url: str = None, extract_to: str = "models"):
-
-    
-    if model_url is None:
-        model_url = "https://alphacephei.com/vosk/models/vosk-model-en-us-0.22.zip"
-    
-    model_name = os.path.basename(model_url).replace('.zip', '')
-    model_zip_path = os.path.join(extract_to, os.path.basename(model_url))
-    model_extract_path = os.path.join(extract_to, model_name)
-    os.makedirs(extract_to, exist_ok=True)
-    if os.path.exists(model_extract_path):
-        print(f"Model already exists at {model_extract_path}")
-        return model_extract_path
-    
-    print(f"Downloading Vosk model from {model_url}...")
-    
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from vocalshell.provisioning import ModelProvisioner, ProvisioningError, DEFAULT_MODEL_URL  # noqa: E402
+
+
+def download_vosk_model(model_url: str = None, extract_to: str = "models", sha256: str = None,
+                        mirror_dir: str = None, show_progress: bool = True):
+    """Download (resuming if interrupted) and unpack a Vosk model.
+
+    Returns the model directory, or None on failure.
+    """
+    provisioner = ModelProvisioner(extract_to, mirror_dir=mirror_dir)
+    done = threading.Event()
+
+    def report():
+        while not done.wait(1.0):
+            status = provisioner.snapshot()
+            if status["state"] == "downloading" and status["total"]:
+                percent = 100 * status["received"] / status["total"]
+                print(f"\rDownloading... {percent:5.1f}% ({status['received'] >> 20} MB)", end="", flush=True)
+            elif status["state"] in ("verifying", "extracting"):
+                print(f"\r{status['state'].capitalize()}...{' ' * 30}", end="", flush=True)
+
+    if show_progress:
+        threading.Thread(target=report, daemon=True).start()
     try:
-        urllib.request.urlretrieve(model_url, model_zip_path)
-        print("Download completed!")
-        print("Extracting model...")
-        with zipfile.ZipFile(model_zip_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_to)
-        os.remove(model_zip_path)
-        
-        print(f"Model extracted to {model_extract_path}")
-        return model_extract_path
-        
-    except Exception as e:
-        print(f"Error downloading model: {e}")
-       
-        if os.path.exists(model_zip_path):
-            os.remove(model_zip_path)
+        return provisioner.provision(model_url or DEFAULT_MODEL_URL, sha256)
+    except ProvisioningError as e:
+        print(f"\nError downloading model: {e}")
         return None
+    finally:
+        done.set()
+        if show_progress:
+            print()
+
 
 if __name__ == "__main__":
-    model_path = download_vosk_model()
+    ap = argparse.ArgumentParser(description="Download and unpack a Vosk model")
+    ap.add_argument("--url", default=DEFAULT_MODEL_URL)
+    ap.add_argument("--dir", default="models", help="Directory to unpack into")
+    ap.add_argument("--sha256", help="Expected SHA-256 of the zip")
+    ap.add_argument("--mirror", help="Local directory to take the zip from when present")
+    args = ap.parse_args()
+
+    model_path = download_vosk_model(args.url, args.dir, args.sha256, args.mirror)
     if model_path:
         print(f"Vosk model ready at: {model_path}")
     else:
         print("Failed to download Vosk model")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -1,14 +1,24 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from typing import List, Optional
+
+import asyncio
+import json
+from contextlib import ExitStack
 
 from vocalshell.nlp_parser import NLPCommandParser
 from vocalshell.command_executor import CommandExecutor
 from vocalshell.utils import load_config
 from vocalshell.speech_engine import SpeechRecognizer
-
-import tempfile
-import os
+from vocalshell.workers import WorkerPools, ServerBusy
+from vocalshell.session import SessionStore
+from vocalshell.script_builder import ScriptCompiler
+from vocalshell.history import HistoryStore
+from vocalshell.provisioning import ModelProvisioner, DEFAULT_MODEL_URL, is_model_dir
+from vocalshell.model_registry import get_model_registry
 
 # ------------------------------------------
 # FastAPI Setup
@@ -26,8 +36,18 @@ app.add_middleware(
 # Load Components
 # ------------------------------------------
 config = load_config("config/system_config.json")
-parser = NLPCommandParser(config["system"]["commands_config"])
+history = HistoryStore.from_config(
+    config.get("history"),
+    load_config(config["system"].get("voice_settings", "config/voice_settings.json")).get("preferences")
+)
+parser = NLPCommandParser(
+    config["system"]["commands_config"],
+    normalize_steps=config.get("nlp", {}).get("normalize_steps"),
+    history=history
+)
 executor = CommandExecutor(config.get("executor", {}))
+sessions = SessionStore(config.get("server", {}))
+scripts = ScriptCompiler()
 
 speech = SpeechRecognizer(
     model_path=config["system"]["model_path"],
@@ -35,11 +55,197 @@ speech = SpeechRecognizer(
     config=config.get("speech", {})
 )
 
+workers = WorkerPools(
+    config.get("server", {}),
+    model_path=config["system"]["model_path"],
+    speech_config=config.get("speech", {})
+)
+
+models_config = config.get("models", {})
+provisioner = ModelProvisioner.from_config(models_config)
+
+
+def speech_model_ready():
+    return is_model_dir(config["system"]["model_path"])
+
+
+def require_speech_model():
+    if not speech_model_ready():
+        status = provisioner.snapshot()
+        raise HTTPException(status_code=503, detail=f"Speech model not ready ({status['state']})")
+
+
+def load_speech_model():
+    # Not speech.warmup(): that skips Vosk when prefer_offline is off, but
+    # /process-voice and /ws/voice always decode with it
+    return speech.models.warmup(
+        [config["system"]["model_path"]],
+        prefetch=config["speech"].get("prefetch_model", False)
+    )
+
+
+if models_config.get("preload") and speech_model_ready():
+    # Loaded at import time: under a pre-forking server (gunicorn --preload)
+    # that is once in the master, and every worker shares the pages
+    load_speech_model()
+
+
+@app.on_event("startup")
+def warmup_speech_model():
+    # Pay the Vosk model load once at startup, not on the first request.
+    # The decoders are forked after it, so they share the loaded model.
+    if speech_model_ready():
+        load_speech_model()
+        workers.start_decoders()
+    elif models_config.get("auto_provision", True):
+        loop = asyncio.get_running_loop()
+
+        def on_ready(path):
+            # Voice decodes from system.model_path, which models.url unpacks to
+            load_speech_model()
+            # Fork from the event loop thread, not this provisioning thread
+            loop.call_soon_threadsafe(lambda: workers.start_decoders(wait=False))
+
+        # Start degraded: text commands work now, voice once the model is in
+        provisioner.start(
+            models_config.get("url", DEFAULT_MODEL_URL),
+            models_config.get("sha256"),
+            on_ready=on_ready
+        )
+
+
+@app.on_event("startup")
+def watch_command_config():
+    # Edits to commands_config.json take effect without a restart
+    parser.watch(config["system"].get("config_reload_interval", 1.0))
+
+
+@app.on_event("shutdown")
+def stop_workers():
+    parser.stop_watching()
+    history.close()
+    workers.shutdown()
+
+
+# ------------------------------------------
+# Command Handling
+# ------------------------------------------
+def run_command(text, session_id=None, not_understood="Could not understand command"):
+    # Blocking parse + execute; always called on a worker thread
+    session = sessions.get(session_id)
+    return execute_parsed(text, parser.parse_command(text, session.id), session, not_understood)
+
+
+def execute_parsed(text, parsed, session, not_understood="Could not understand command"):
+    command, params, description, metadata = parsed
+
+    if command is None:
+        return not_run(text, description, metadata, session, not_understood)
+
+    success, output = executor.execute_command(command, metadata, session)
+    record_history(text, command, success, output, metadata, session)
+
+    return {
+        "success": success,
+        "text": text,
+        "command": command,
+        "output": output,
+        "cwd": session.cwd,
+        "session_id": session.id
+    }
+
+
+def not_run(text, description, metadata, session, not_understood):
+    result = {"success": False, "text": text, "output": not_understood, "session_id": session.id}
+    if metadata.get("category") == "repeat":
+        # Nothing to repeat, or a partial history match the client must confirm
+        result["output"] = description
+        if "candidate" in metadata:
+            result["candidate"] = metadata["candidate"]
+    return result
+
+
+def record_history(text, command, success, output, metadata, session):
+    history.append({
+        "original": text,
+        "command": command,
+        "success": success,
+        "output": output,
+        "metadata": metadata,
+        "session_id": session.id
+    })
+
+
+async def stream_command(text, session_id=None, not_understood="Could not understand command"):
+    """Parse ``text`` and yield output events while the command runs.
+
+    Yields ``{"type": "output", "stream": ..., "text": ...}`` per line and a
+    closing ``{"type": "result", ...}`` shaped like ``run_command``'s reply.
+    """
+    session = sessions.get(session_id)
+    command, params, description, metadata = await workers.run(parser.parse_command, text, session.id)
+
+    if command is None:
+        yield dict(not_run(text, description, metadata, session, not_understood), type="result")
+        return
+
+    yield {"type": "command", "text": text, "command": command}
+
+    events = executor.stream_command(command, metadata, session)
+    lines = []
+    returncode = 1
+    try:
+        while True:
+            # Each line is pulled on a worker thread; the loop never blocks on the pipe
+            event = await workers.run(next, events, None)
+            if event is None:
+                break
+            kind, data = event
+            if kind == "exit":
+                returncode = data
+                continue
+            lines.append(data)
+            yield {"type": "output", "stream": kind, "text": data}
+    finally:
+        try:
+            events.close()
+        except ValueError:
+            # Cancelled while a worker thread is still inside next(); that
+            # thread finishes the read and the generator is collected after
+            pass
+
+    output = "\n".join(lines) or "Command executed successfully"
+    record_history(text, command, returncode == 0, output, metadata, session)
+    yield {
+        "type": "result",
+        "success": returncode == 0,
+        "text": text,
+        "command": command,
+        "output": output,
+        "cwd": session.cwd,
+        "session_id": session.id
+    }
+
+
 # ------------------------------------------
 # Text Request Model
 # ------------------------------------------
 class TextRequest(BaseModel):
     text: str
+    session_id: Optional[str] = None
+
+
+class BatchRequest(BaseModel):
+    texts: List[str]
+    session_id: Optional[str] = None
+    # False runs every item in order, as if typed one after another
+    concurrent: bool = True
+
+
+class ScriptRequest(BaseModel):
+    texts: List[str]
+    session_id: Optional[str] = None
+    run: bool = False
 
 # ------------------------------------------
 # Routes
@@ -47,71 +253,245 @@ class TextRequest(BaseModel):
 
 @app.get("/")
 def home():
-    return {"status": "VocalShell API running"}
+    if speech_model_ready():
+        return {"status": "VocalShell API running", "speech": "ready"}
+    return {"status": "VocalShell API running (degraded)", "speech": provisioner.snapshot()}
+
+
+# Resident memory of this process and its decoder processes; "pss" splits
+# shared model pages between the processes that map them
+@app.get("/memory")
+def memory():
+    return {"processes": workers.memory(), "models": get_model_registry().loaded_models()}
+
+
+# -----------------------------------------------------------
+# COMMAND HISTORY (NEWEST FIRST, PAGED)
+# -----------------------------------------------------------
+# ?limit= page size, ?since= ISO time or epoch seconds, ?before= id of the
+# oldest entry already shown; pass next_before back to get the next page.
+@app.get("/history")
+async def get_history(limit: int = 50, since: Optional[str] = None, before: Optional[int] = None):
+    limit = max(1, min(limit, 500))
+    try:
+        entries = await run_in_threadpool(history.query, limit, since, before)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid since: {e}")
+    return {
+        "entries": entries,
+        "next_before": entries[-1]["id"] if len(entries) == limit else None
+    }
 
 
 # -----------------------------------------------------------
 # PROCESS TEXT COMMAND
 # -----------------------------------------------------------
 @app.post("/process-text")
-def process_text(request: TextRequest):
+async def process_text(request: TextRequest):
     text = request.text.strip()
 
-    command, params, description, metadata = parser.parse_command(text)
+    try:
+        with workers.admission():
+            return await workers.run(run_command, text, request.session_id)
+    except ServerBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
-    if command is None:
-        return {
-            "success": False,
-            "output": "Could not understand command"
-        }
 
-    success, output = executor.execute_command(command, metadata)
+# -----------------------------------------------------------
+# PROCESS TEXT COMMAND, STREAMING OUTPUT (NDJSON)
+# -----------------------------------------------------------
+@app.post("/process-text/stream")
+async def process_text_stream(request: TextRequest):
+    text = request.text.strip()
 
-    return {
-        "success": success,
-        "command": command,
-        "output": output
-    }
+    # Admission is held until the last line is sent, not just until we return
+    with ExitStack() as stack:
+        try:
+            stack.enter_context(workers.admission())
+        except ServerBusy as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        held = stack.pop_all()
+
+    async def body():
+        with held:
+            async for event in stream_command(text, request.session_id):
+                yield json.dumps(event) + "\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+# -----------------------------------------------------------
+# PROCESS A BATCH OF TEXT COMMANDS
+# -----------------------------------------------------------
+@app.post("/process-batch")
+async def process_batch(request: BatchRequest):
+    texts = [text.strip() for text in request.texts]
+    max_batch = config.get("server", {}).get("max_batch", 100)
+    if len(texts) > max_batch:
+        raise HTTPException(status_code=413, detail=f"Batch too large: {len(texts)} > {max_batch}")
+
+    try:
+        with workers.admission():
+            session = sessions.get(request.session_id)
+            # One parser call for the whole batch; repeated lines are parsed once
+            parsed = await workers.run(parser.parse_many, texts, session.id)
+
+            # Items before the first cd/export run concurrently. From there on
+            # each command depends on the session state left by the previous one.
+            ordered_from = len(texts)
+            if not request.concurrent:
+                ordered_from = 0
+            else:
+                for i, (command, params, description, metadata) in enumerate(parsed):
+                    if command is not None and executor.changes_session(command):
+                        ordered_from = i
+                        break
+
+            limit = asyncio.Semaphore(config.get("server", {}).get("batch_concurrency", 4))
+
+            async def run_item(i):
+                async with limit:
+                    return await workers.run(execute_parsed, texts[i], parsed[i], session)
+
+            results = list(await asyncio.gather(*(run_item(i) for i in range(ordered_from))))
+            for i in range(ordered_from, len(texts)):
+                results.append(await run_item(i))
+
+            return {"session_id": session.id, "results": results}
+    except ServerBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+# -----------------------------------------------------------
+# COMPILE (AND OPTIONALLY RUN) A SCRIPT
+# -----------------------------------------------------------
+def build_script(texts, session_id=None, run=False):
+    script, skipped = scripts.compile_utterances(parser, texts)
+    result = {"script": script, "extension": scripts.extension, "skipped": skipped}
+    if run:
+        session = sessions.get(session_id)
+        # One shell for the whole sequence instead of one per command
+        success, output = scripts.run(script, session)
+        result.update(success=success, output=output, session_id=session.id)
+    return result
+
+
+@app.post("/compile-script")
+async def compile_script(request: ScriptRequest):
+    texts = [text.strip() for text in request.texts]
+    try:
+        with workers.admission():
+            return await workers.run(build_script, texts, request.session_id, request.run)
+    except ServerBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 
 # -----------------------------------------------------------
 # PROCESS VOICE COMMAND (MIC AUDIO FROM FRONTEND)
 # -----------------------------------------------------------
 @app.post("/process-voice")
-async def process_voice(file: UploadFile = File(...)):
+async def process_voice(file: UploadFile = File(...), session_id: Optional[str] = None):
+    require_speech_model()
+    try:
+        with workers.admission():
+            # Small uploads are decoded straight from memory. Past the opt-in
+            # threshold we stream from Starlette's spooled upload file instead.
+            spill_over = config["speech"].get("upload_spill_bytes")
+            if spill_over and file.size is not None and file.size > spill_over:
+                source = file.file
+            else:
+                source = await file.read()
 
-    # Save temp file for speech engine
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-        tmp.write(await file.read())
-        audio_path = tmp.name
+            # Run speech-to-text
+            text = await workers.decode(source, fallback=speech.transcribe_audio)
 
-    # Run speech-to-text
-    text = speech.transcribe_audio(audio_path)
+            if not text:
+                return {
+                    "success": False,
+                    "output": "Speech not recognized"
+                }
 
-    # Delete temp file
-    os.remove(audio_path)
+            # Parse + Execute the command
+            return await workers.run(
+                run_command, text, session_id, "Could not understand spoken command"
+            )
+    except ServerBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
-    if not text:
-        return {
-            "success": False,
-            "output": "Speech not recognized"
-        }
 
-    # Parse + Execute the command
-    command, params, description, metadata = parser.parse_command(text)
+# -----------------------------------------------------------
+# STREAMING VOICE COMMAND (LIVE PCM OVER WEBSOCKET)
+# -----------------------------------------------------------
+# Client sends binary frames of 16-bit mono PCM at ?sample_rate= (default
+# 16000) and may send {"event": "end"} to flush the current utterance.
+# Server replies with {"type": "partial"|"final"|"command"|"output"|"result"|"error", ...};
+# command output arrives as "output" lines before the closing "result".
+# Without ?session_id= each connection gets its own working directory.
+@app.websocket("/ws/voice")
+async def voice_stream(websocket: WebSocket, sample_rate: int = 16000, session_id: Optional[str] = None):
+    await websocket.accept()
 
-    if command is None:
-        return {
-            "success": False,
-            "text": text,
-            "output": "Could not understand spoken command"
-        }
+    # Held for as long as the connection stays open, against the stream
+    # limit rather than the one HTTP requests share
+    try:
+        with workers.stream_admission():
+            await serve_voice_stream(websocket, sample_rate, session_id or sessions.get().id)
+    except ServerBusy as e:
+        await websocket.send_json({"type": "error", "output": str(e)})
+        await websocket.close(code=1013)
 
-    success, output = executor.execute_command(command, metadata)
 
-    return {
-        "success": success,
-        "text": text,
-        "command": command,
-        "output": output
-    }
+async def serve_voice_stream(websocket, sample_rate, session_id):
+    try:
+        require_speech_model()
+        # Holds a pooled recognizer until the connection closes; waits at
+        # most speech.recognizer_timeout for one to come free
+        stream = await run_in_threadpool(speech.open_stream, sample_rate)
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "output": e.detail})
+        await websocket.close()
+        return
+    except TimeoutError:
+        await websocket.send_json({"type": "error", "output": "Server busy: no speech recognizer free, try again"})
+        await websocket.close(code=1013)
+        return
+    except Exception as e:
+        await websocket.send_json({"type": "error", "output": f"Speech engine unavailable: {e}"})
+        await websocket.close()
+        return
+
+    async def finish_utterance(text):
+        await websocket.send_json({"type": "final", "text": text})
+        if text:
+            async for event in stream_command(text, session_id, "Could not understand spoken command"):
+                await websocket.send_json(event)
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            if message.get("bytes"):
+                event = await run_in_threadpool(stream.feed, message["bytes"])
+                if event is None:
+                    continue
+                kind, text = event
+                if kind == "partial":
+                    await websocket.send_json({"type": "partial", "text": text})
+                else:
+                    # Endpoint detected: act on it without waiting for the client
+                    await finish_utterance(text)
+
+            elif message.get("text"):
+                try:
+                    control = json.loads(message["text"])
+                except ValueError:
+                    continue
+                if control.get("event") == "end":
+                    await finish_utterance(await run_in_threadpool(stream.finish))
+
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stream.close()
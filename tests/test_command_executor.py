@@ -0,0 +1,81 @@
+import sys
+
+import pytest
+
+from vocalshell.command_executor import CommandExecutor, OutputCap
+from vocalshell.session import Session
+
+posix_only = pytest.mark.skipif(sys.platform == "win32", reason="uses POSIX shell commands")
+
+
+def test_output_cap_passes_lines_that_fit():
+    cap = OutputCap(20)
+
+    assert cap.take("0123456789") == "0123456789"
+    assert cap.take("abcdefghijkl") == "abcdefghi"
+    assert cap.truncated
+    assert cap.take("more") is None
+    assert cap.notice() == "[output truncated after 20 bytes]"
+    assert cap.notice() is None
+
+
+def test_output_cap_line_that_exactly_fills():
+    cap = OutputCap(10)
+
+    assert cap.take("0123456789") == "0123456789"
+    # The newline pushed used past the limit; nothing else fits
+    assert cap.take("x") is None
+    assert cap.truncated and cap.used == 10
+
+
+def test_output_cap_does_not_split_characters():
+    cap = OutputCap(4)
+
+    assert cap.take("abéé") == "abé"
+
+
+def test_no_limit_passes_everything():
+    cap = OutputCap(None)
+
+    assert cap.take("x" * 10000) == "x" * 10000
+    assert cap.notice() is None
+
+
+@pytest.fixture
+def executor():
+    return CommandExecutor({"max_output_length": 12})
+
+
+def test_cd_and_export_change_only_the_session(executor, tmp_path):
+    (tmp_path / "logs").mkdir()
+    session = Session(cwd=str(tmp_path), env={"HOME": str(tmp_path)})
+    other = Session(cwd=str(tmp_path))
+
+    assert executor.execute_command("export LOGS=logs", {}, session) == (True, "Set LOGS=logs")
+    success, _ = executor.execute_command("cd $LOGS", {}, session)
+
+    assert success and session.cwd == str(tmp_path / "logs")
+    assert other.cwd == str(tmp_path) and "LOGS" not in other.env
+
+
+def test_cd_alias_uses_the_session_home(executor, tmp_path):
+    (tmp_path / "Downloads").mkdir()
+    session = Session(cwd="/", env={"HOME": str(tmp_path)})
+
+    executor.execute_command("cd downloads", {}, session)
+
+    assert session.cwd == str(tmp_path / "Downloads")
+
+
+@posix_only
+def test_stream_command_caps_output(executor, tmp_path):
+    session = Session(cwd=str(tmp_path))
+
+    events = list(executor.stream_command("printf 'hello\\nworld\\nagain\\n'", {}, session))
+
+    assert events == [
+        ("stdout", "hello"),
+        ("stdout", "world"),
+        ("stderr", "[output truncated after 12 bytes]"),
+        ("exit", 0),
+    ]
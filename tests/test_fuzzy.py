@@ -0,0 +1,33 @@
+import pytest
+
+from vocalshell.fuzzy import TrigramIndex, bounded_distance, trigrams
+
+
+@pytest.mark.parametrize("a, b, limit, expected", [
+    ("kitten", "sitting", 3, 3),
+    ("kitten", "kitten", 0, 0),
+    ("flaw", "lawn", 2, 2),
+    ("", "abc", 3, 3),
+    # Past the limit the exact distance is not computed
+    ("kitten", "sitting", 2, 3),
+    ("short", "a much longer text", 2, 3),
+])
+def test_bounded_distance(a, b, limit, expected):
+    assert bounded_distance(a, b, limit) == expected
+    assert bounded_distance(b, a, limit) == expected
+
+
+def test_trigrams_are_padded():
+    assert trigrams("ls") == {"  l", " ls", "ls "}
+
+
+def test_trigram_index_ranks_by_overlap_then_distance():
+    index = TrigramIndex()
+    for phrase in ["list files", "list folders", "show date"]:
+        index.add(phrase, phrase.upper())
+
+    assert index.candidates("list files", k=1) == [(1.0, 0)]
+    similarity, key = index.search("list filez")
+    assert key == "LIST FILES" and similarity == pytest.approx(0.9)
+    assert index.search("show date and time", threshold=0.9) is None
+    assert len(index) == 3
@@ -0,0 +1,53 @@
+import pytest
+
+from vocalshell.grammar import CompiledGrammar
+
+MAPPINGS = {
+    "files": {"patterns": ["list files", "show file (.*)", "show file (.*) page by page"]},
+    "copy": {"patterns": ["copy file (.*) to (.*)"]},
+    "number": {"patterns": [r"^\d+$"]},
+    "broken": {"patterns": ["open (unclosed"]},
+}
+
+
+@pytest.fixture
+def grammar():
+    return CompiledGrammar(MAPPINGS)
+
+
+def test_rules_are_indexed_by_first_literal(grammar):
+    assert [r.pattern for r in grammar.candidates(["copy"])] == [r"^\d+$", "copy file (.*) to (.*)"]
+    # A word that starts no pattern only brings the unanchored rules
+    assert [r.pattern for r in grammar.candidates(["file"])] == [r"^\d+$"]
+
+
+def test_invalid_pattern_is_skipped(grammar):
+    assert len(grammar) == 5
+    assert all(r.category != "broken" for r in grammar.rules)
+
+
+def test_most_specific_match_wins(grammar):
+    best = grammar.match("show file notes.txt page by page")
+
+    assert best.rule.pattern == "show file (.*) page by page"
+    assert best.match.group(1) == "notes.txt"
+    assert best.score == 1.0
+
+
+def test_match_captures_groups(grammar):
+    best = grammar.match("copy file a.txt to backup")
+
+    assert best.rule.category == "copy"
+    assert best.match.groups() == ("a.txt", "backup")
+
+
+def test_misheard_first_word_matches_fuzzily(grammar):
+    best = grammar.match("lost files")
+
+    assert best.rule.pattern == "list files"
+    assert best.match is None
+    assert 0.7 <= best.score < 1.0
+
+
+def test_unrelated_text_does_not_match(grammar):
+    assert grammar.match("what is the weather") is None
@@ -0,0 +1,125 @@
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from vocalshell.history import HistoryIndex, HistoryStore, parse_time
+from vocalshell.nlp_parser import NLPCommandParser
+
+
+@pytest.fixture
+def history():
+    history = HistoryStore(path=None)
+    history.append({"original": "ping google dot com", "command": "ping google.com", "metadata": {"dangerous": False}})
+    history.append({"original": "list files", "command": "ls", "metadata": {"dangerous": False}})
+    return history
+
+
+@pytest.fixture
+def parser(history):
+    return NLPCommandParser("config/system_config.json", history=history)
+
+
+@pytest.mark.parametrize("text", ["repeat the ping", "rerun the ping command", "redo the ping from today"])
+def test_repeat_by_name(parser, text):
+    command, _, _, metadata = parser.parse_command(text)
+
+    assert command == "ping google.com"
+    assert metadata["category"] == "repeat" and metadata["repeat_of"] == 1
+
+
+@pytest.mark.parametrize("text", ["repeat ping", "rerun pinging google"])
+def test_unknown_repeat_offers_candidate(parser, text):
+    command, _, message, metadata = parser.parse_command(text)
+
+    assert command is None
+    assert metadata["candidate"]["command"] == "ping google.com"
+    assert "Did you mean" in message
+
+
+def test_unmatched_repeat_is_never_run(parser):
+    command, _, message, metadata = parser.parse_command("repeat rm dash rf")
+
+    assert command is None
+    assert metadata["category"] == "repeat"
+    assert message == "Nothing in history matches"
+
+
+def test_rotation_keeps_backup_count_files(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    store = HistoryStore(path, max_entries=3, max_bytes=300, backup_count=2, flush_every=1, flush_interval=0)
+    for i in range(40):
+        store.append({"original": f"echo {i}", "command": f"echo {i}"})
+    store.close()
+
+    assert os.path.exists(path + ".1") and os.path.exists(path + ".2")
+    assert not os.path.exists(path + ".3")
+    assert os.path.getsize(path) < 300 + 100
+
+    # A new store picks up the ids and recent entries where this one stopped
+    reopened = HistoryStore(path, max_entries=3, flush_interval=0)
+    assert [e["id"] for e in reopened.recent] == [38, 39, 40]
+    assert reopened.append({"command": "ls"})["id"] == 41
+
+
+def test_query_pages_past_memory_into_files(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    store = HistoryStore(path, max_entries=3, max_bytes=0, flush_every=100, flush_interval=0)
+    for i in range(10):
+        store.append({"original": f"echo {i}", "command": f"echo {i}"})
+
+    first = store.query(limit=4)
+    second = store.query(limit=4, before=first[-1]["id"])
+    last = store.query(limit=4, before=second[-1]["id"])
+
+    assert [e["id"] for e in first] == [10, 9, 8, 7]
+    assert [e["id"] for e in second] == [6, 5, 4, 3]
+    assert [e["id"] for e in last] == [2, 1]
+    store.close()
+
+
+def test_query_since_accepts_aware_times():
+    store = HistoryStore(path=None)
+    for hour in (10, 11, 12, 13):
+        store.append({"command": f"echo {hour}", "timestamp": str(datetime(2026, 1, 1, hour))})
+
+    local = datetime(2026, 1, 1, 11, 30)
+    utc = local.astimezone(timezone.utc)
+
+    expected = ["echo 13", "echo 12"]
+    assert [e["command"] for e in store.query(since=local)] == expected
+    assert [e["command"] for e in store.query(since=local.astimezone())] == expected
+    assert [e["command"] for e in store.query(since=utc.isoformat())] == expected
+    assert [e["command"] for e in store.query(since=utc.strftime("%Y-%m-%dT%H:%M:%SZ"))] == expected
+    assert parse_time(utc).tzinfo is None
+
+
+def test_search_requires_every_word_unless_partial():
+    index = HistoryIndex()
+    index.add({"id": 1, "original": "ping google dot com", "command": "ping google.com"})
+    index.add({"id": 2, "original": "list the logs folder", "command": "ls logs"})
+    index.add({"id": 3, "original": "ping localhost", "command": "ping localhost"})
+
+    assert [e["id"] for e in index.search("ping")] == [3, 1]
+    assert [e["id"] for e in index.search("ping google", partial=False)] == [1]
+    assert index.search("ping logs", partial=False) == []
+    assert [e["id"] for e in index.search("ping logs", limit=3)] == [3, 2, 1]
+    # Entries with every word come before the newest partial ones
+    index.add({"id": 4, "original": "ping the logs server", "command": "ping logs"})
+    index.add({"id": 5, "original": "ping router", "command": "ping router"})
+    assert [e["id"] for e in index.search("ping logs", limit=2)] == [4, 5]
+    # The last word may be a prefix of an indexed word
+    assert [e["id"] for e in index.search("local")] == [3]
+    assert index.search("local", prefix=False) == []
+
+
+def test_recent_by_session_and_rebuild():
+    index = HistoryIndex(max_entries=4)
+    for i in range(1, 8):
+        index.add({"id": i, "command": f"echo {i}", "session_id": "a" if i % 2 else "b"})
+
+    assert index.recent(1)["id"] == 7
+    assert index.recent(2, "b")["id"] == 4
+    assert index.recent(10) is None
+    # Past max_entries plus slack the oldest entries are dropped
+    assert 1 not in index.entries and 7 in index.entries
@@ -0,0 +1,45 @@
+import pytest
+
+from vocalshell.normalizer import TextNormalizer, filler_patterns
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Please list files", "list files"),
+    ("I would like to CD Downloads please", "cd downloads"),
+    ("could   you open notes.txt", "open notes"),
+    # Fillers only go on word boundaries
+    ("just justify the text", "justify the text"),
+    ("cd ..", "cd .."),
+    # Shell syntax typed at /process-text survives
+    ("echo $(date) | grep 2026", "echo $(date) | grep 2026"),
+    ("echo hi; echo there", "echo hi; echo there"),
+])
+def test_default_steps(text, expected):
+    assert TextNormalizer()(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("list files.", "list files"),
+    ("desktop, please", "desktop"),
+    ("cd ..", "cd .."),
+    ("open port eight zero eight zero", "open port 8080"),
+    ("one hundred and five apples", "105 apples"),
+    ("one and two", "1 and 2"),
+    ("twenty five", "25"),
+])
+def test_optional_steps(text, expected):
+    normalize = TextNormalizer(["lowercase", "fillers", "punctuation", "numbers"])
+    assert normalize(text) == expected
+
+
+def test_custom_fillers_and_callable_steps():
+    normalize = TextNormalizer(["fillers", str.upper], filler_words=["UM", "  "])
+
+    assert normalize("um list files") == "LIST FILES"
+    assert filler_patterns(["", " "]) == []
+    assert TextNormalizer(filler_words=[])("please list") == "please list"
+
+
+def test_unknown_step_is_rejected():
+    with pytest.raises(ValueError, match="Unknown normalization step"):
+        TextNormalizer(["lowercase", "shout"])
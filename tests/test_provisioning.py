@@ -0,0 +1,259 @@
+import os
+import hashlib
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from vocalshell import provisioning
+from vocalshell.provisioning import ModelProvisioner, ProvisioningError, READY_MARKER
+
+NAME = "vosk-model-test"
+PAYLOAD = os.urandom(256 * 1024)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves ``server.payload``, honouring ``Range`` unless told not to.
+
+    ``server.drop_after`` cuts the next response off after that many
+    bytes, as a dropped connection would.
+    """
+
+    def do_GET(self):
+        server = self.server
+        requested = self.headers.get("Range")
+        server.ranges.append(requested)
+        data = server.payload
+        start = 0
+        if requested and server.honour_range:
+            start = int(requested.split("=", 1)[1].rstrip("-"))
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        body = data[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if server.drop_after is not None:
+            body, server.drop_after = body[:server.drop_after], None
+            self.close_connection = True
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    httpd.payload = PAYLOAD
+    httpd.honour_range = True
+    httpd.drop_after = None
+    httpd.ranges = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/{NAME}.zip"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(provisioning.time, "sleep", lambda seconds: None)
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_model_zip(path, files=None):
+    files = files or {"conf/model.conf": b"--sample-frequency=16000\n", "am/final.mdl": os.urandom(4096)}
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in files.items():
+            zf.writestr(f"{NAME}/{name}", data)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_download_resumes_after_dropped_connection(server, tmp_path):
+    server.drop_after = 100 * 1024
+    dest = str(tmp_path / "model.zip")
+
+    digest = ModelProvisioner(str(tmp_path), chunk_size=16 * 1024).download(server.url, dest, sha256(PAYLOAD))
+
+    assert digest == sha256(PAYLOAD)
+    assert server.ranges == [None, f"bytes={100 * 1024}-"]
+    with open(dest, "rb") as f:
+        assert f.read() == PAYLOAD
+    assert not os.path.exists(dest + ".part")
+
+
+def test_download_treats_416_as_complete(server, tmp_path):
+    dest = str(tmp_path / "model.zip")
+    with open(dest + ".part", "wb") as f:
+        f.write(PAYLOAD)
+
+    ModelProvisioner(str(tmp_path)).download(server.url, dest, sha256(PAYLOAD))
+
+    assert server.ranges == [f"bytes={len(PAYLOAD)}-"]
+    with open(dest, "rb") as f:
+        assert f.read() == PAYLOAD
+
+
+def test_download_restarts_when_range_is_ignored(server, tmp_path):
+    server.honour_range = False
+    dest = str(tmp_path / "model.zip")
+    with open(dest + ".part", "wb") as f:
+        f.write(b"stale bytes from another file")
+
+    ModelProvisioner(str(tmp_path)).download(server.url, dest, sha256(PAYLOAD))
+
+    with open(dest, "rb") as f:
+        assert f.read() == PAYLOAD
+
+
+def test_checksum_mismatch_discards_download(server, tmp_path):
+    dest = str(tmp_path / "model.zip")
+
+    with pytest.raises(ProvisioningError, match="Checksum mismatch"):
+        ModelProvisioner(str(tmp_path)).download(server.url, dest, "0" * 64)
+
+    assert not os.path.exists(dest)
+    assert not os.path.exists(dest + ".part")
+
+
+def test_gives_up_after_retries(server, tmp_path):
+    server.payload = b""
+    url = server.url
+    server.shutdown()
+    server.server_close()
+
+    with pytest.raises(ProvisioningError, match="failed"):
+        ModelProvisioner(str(tmp_path), retries=2, timeout=1).download(url, str(tmp_path / "model.zip"))
+
+
+def test_provision_downloads_and_extracts(server, tmp_path):
+    server.payload = make_model_zip(str(tmp_path / "source.zip"))
+    models = tmp_path / "models"
+    provisioner = ModelProvisioner(str(models))
+
+    path = provisioner.provision(server.url, sha256(server.payload))
+
+    assert path == os.path.join(str(models), NAME)
+    assert os.path.exists(os.path.join(path, READY_MARKER))
+    assert os.path.exists(os.path.join(path, "conf", "model.conf"))
+    assert not os.path.exists(os.path.join(str(models), f"{NAME}.zip"))
+    assert provisioner.ready
+
+    # Already provisioned: nothing is fetched again
+    requests = len(server.ranges)
+    assert ModelProvisioner(str(models)).provision(server.url) == path
+    assert len(server.ranges) == requests
+
+
+def test_provision_uses_mirror(tmp_path):
+    mirror = tmp_path / "mirror"
+    mirror.mkdir()
+    data = make_model_zip(str(mirror / f"{NAME}.zip"))
+    models = tmp_path / "models"
+
+    # Nothing listens on this port; only the mirror can satisfy it
+    url = f"http://127.0.0.1:9/{NAME}.zip"
+    path = ModelProvisioner(str(models), mirror_dir=str(mirror), retries=1).provision(url, sha256(data))
+
+    assert os.path.exists(os.path.join(path, READY_MARKER))
+    # The mirror's copy is left alone
+    assert os.path.exists(mirror / f"{NAME}.zip")
+
+    with pytest.raises(ProvisioningError, match="Checksum mismatch"):
+        ModelProvisioner(str(tmp_path / "other"), mirror_dir=str(mirror)).provision(url, "0" * 64)
+
+
+def test_extract_skips_complete_files(tmp_path):
+    archive = str(tmp_path / "model.zip")
+    make_model_zip(archive)
+    provisioner = ModelProvisioner(str(tmp_path))
+
+    assert provisioner.extract(archive, str(tmp_path)) == (2, 0)
+    assert provisioner.extract(archive, str(tmp_path)) == (0, 2)
+
+    # A truncated file is written again
+    with open(tmp_path / NAME / "am" / "final.mdl", "wb") as f:
+        f.write(b"partial")
+    assert provisioner.extract(archive, str(tmp_path)) == (1, 1)
+    assert os.path.getsize(tmp_path / NAME / "am" / "final.mdl") == 4096
+
+
+def test_interrupted_extraction_is_finished(tmp_path):
+    models = tmp_path / "models"
+    models.mkdir()
+    archive = str(models / f"{NAME}.zip")
+    data = make_model_zip(archive)
+    # Stopped half way: the directory looks like a model but the zip is still there
+    (models / NAME / "conf").mkdir(parents=True)
+    (models / NAME / "conf" / "model.conf").write_bytes(b"--sample-frequency=16000\n")
+
+    path = ModelProvisioner(str(models)).provision(f"http://127.0.0.1:9/{NAME}.zip", sha256(data))
+
+    assert os.path.getsize(os.path.join(path, "am", "final.mdl")) == 4096
+    assert os.path.exists(os.path.join(path, READY_MARKER))
+    assert not os.path.exists(archive)
+
+
+def test_rejects_paths_outside_the_models_dir(tmp_path):
+    archive = str(tmp_path / "evil.zip")
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("../outside.txt", b"x")
+
+    with pytest.raises(ProvisioningError, match="Unsafe path"):
+        ModelProvisioner(str(tmp_path)).extract(archive, str(tmp_path / "models"))
+    assert not os.path.exists(tmp_path / "outside.txt")
+
+
+def test_interrupted_extract_is_not_ready_and_resumes(tmp_path, monkeypatch):
+    mirror = tmp_path / "mirror"
+    mirror.mkdir()
+    data = make_model_zip(str(mirror / f"{NAME}.zip"))
+    models = tmp_path / "models"
+    url = f"http://127.0.0.1:9/{NAME}.zip"
+
+    copy = provisioning.shutil.copyfileobj
+    copied = []
+
+    def crash_after_first(src, dst, length=0):
+        if copied:
+            raise OSError("disk went away")
+        copied.append(1)
+        copy(src, dst, length)
+
+    monkeypatch.setattr(provisioning.shutil, "copyfileobj", crash_after_first)
+    with pytest.raises(OSError):
+        ModelProvisioner(str(models), mirror_dir=str(mirror)).provision(url, sha256(data))
+    monkeypatch.setattr(provisioning.shutil, "copyfileobj", copy)
+
+    path = os.path.join(str(models), NAME)
+    # conf/model.conf made it out, the acoustic model did not
+    assert os.path.exists(os.path.join(path, "conf", "model.conf"))
+    assert not provisioning.is_model_dir(path)
+
+    assert ModelProvisioner(str(models), mirror_dir=str(mirror)).provision(url, sha256(data)) == path
+    assert provisioning.is_model_dir(path)
+    assert os.path.getsize(os.path.join(path, "am", "final.mdl")) == 4096
+    assert not os.path.exists(os.path.join(path, provisioning.EXTRACTING_MARKER))
+
+
+def test_hand_unpacked_model_needs_no_marker(tmp_path):
+    path = tmp_path / NAME
+    (path / "conf").mkdir(parents=True)
+    (path / "conf" / "model.conf").write_bytes(b"")
+    assert provisioning.is_model_dir(str(path))
+
+    (path / "conf" / "mfcc.conf.tmp").write_bytes(b"")
+    assert not provisioning.is_model_dir(str(path))
@@ -0,0 +1,192 @@
+import json
+import time
+
+import pytest
+
+from vocalshell.recognizers import (
+    CircuitBreaker,
+    LatencyTracker,
+    RecognizerRouter,
+    StubBackend,
+    VoskDecoder,
+    build_router,
+)
+
+AUDIO = b"\x00\x01" * 480
+
+
+def test_fallback_skips_failing_backend():
+    router = RecognizerRouter([
+        StubBackend(error=RuntimeError("offline"), name="first"),
+        StubBackend("list files", name="second"),
+    ])
+
+    result = router.transcribe(AUDIO)
+
+    assert (result.text, result.backend) == ("list files", "second")
+    stats = router.stats()
+    assert stats["first"]["errors"] == 1
+    assert stats["second"]["calls"] == 1
+
+
+def test_fallback_moves_on_when_not_confident():
+    router = RecognizerRouter([
+        StubBackend("lust files", confidence=0.2, name="first"),
+        StubBackend("list files", confidence=0.9, name="second"),
+    ], min_confidence=0.5)
+
+    assert router.transcribe(AUDIO).backend == "second"
+
+
+def test_fallback_returns_best_guess_when_none_is_confident():
+    router = RecognizerRouter([
+        StubBackend("lust files", confidence=0.3, name="first"),
+        StubBackend("list files", confidence=0.4, name="second"),
+        StubBackend("", confidence=0.0, name="third"),
+    ], min_confidence=0.5)
+
+    assert router.transcribe(AUDIO).text == "list files"
+
+
+def test_fallback_gives_up_on_slow_backend():
+    slow = StubBackend("too late", delay=0.5, name="slow")
+    slow.timeout = 0.05
+    router = RecognizerRouter([slow, StubBackend("list files", name="fast")])
+
+    start = time.monotonic()
+    result = router.transcribe(AUDIO)
+
+    assert result.backend == "fast"
+    assert time.monotonic() - start < 0.4
+
+
+def test_race_returns_first_confident_answer():
+    router = RecognizerRouter([
+        StubBackend("from the slow one", delay=0.5, name="slow"),
+        StubBackend("list files", delay=0.01, name="fast"),
+    ], mode="race")
+
+    start = time.monotonic()
+    result = router.transcribe(AUDIO)
+
+    assert result.backend == "fast"
+    assert time.monotonic() - start < 0.4
+
+
+def test_empty_audio_is_not_decoded():
+    backend = StubBackend(lambda pcm: pytest.fail("decoded empty audio"))
+    result = RecognizerRouter([backend]).begin().finish()
+
+    assert result.text == "" and result.backend is None
+
+
+def test_open_breaker_skips_backend():
+    flaky = StubBackend(error=RuntimeError("offline"), name="flaky")
+    router = RecognizerRouter([flaky, StubBackend("ok", name="backup")], breaker_failures=2, breaker_reset=60)
+
+    for _ in range(3):
+        assert router.transcribe(AUDIO).backend == "backup"
+
+    assert router.stats()["flaky"]["calls"] == 2
+    assert router.stats()["flaky"]["state"] == "open"
+    assert [b.name for b in router.healthy()] == ["backup"]
+
+
+def test_breaker_lets_one_trial_through_after_reset():
+    breaker = CircuitBreaker(failures=1, reset_after=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_latency_percentiles():
+    tracker = LatencyTracker(window=10)
+    for ms in range(1, 21):
+        tracker.record(ms / 1000)
+    tracker.record(5.0, ok=False)
+
+    stats = tracker.stats()
+    assert stats["calls"] == 21 and stats["errors"] == 1
+    assert stats["p50"] == 0.016
+    assert stats["p95"] == 0.020
+
+
+def test_build_router_from_config():
+    router = build_router({"recognizer_backends": ["stub"], "stub_text": "show date", "recognizer_mode": "race"})
+
+    assert router.mode == "race"
+    assert router.transcribe(AUDIO).text == "show date"
+    with pytest.raises(ValueError):
+        build_router({"recognizer_backends": ["nope"]})
+
+
+class FakeKaldi:
+    """Replays canned Vosk results: one finished segment, then the rest."""
+
+    def __init__(self):
+        self.fed = 0
+
+    def SetWords(self, enabled):
+        pass
+
+    def AcceptWaveform(self, data):
+        self.fed += 1
+        return self.fed == 1
+
+    def Result(self):
+        return json.dumps({"text": "copy file", "result": [
+            {"word": "copy", "conf": 1.0}, {"word": "file", "conf": 0.8},
+        ]})
+
+    def FinalResult(self):
+        return json.dumps({"text": "[unk] report", "result": [
+            {"word": "[unk]", "conf": 0.2}, {"word": "report", "conf": 0.6},
+        ]})
+
+
+class FakePool:
+    def __init__(self):
+        self.released = []
+
+    def acquire(self, timeout=None):
+        return FakeKaldi()
+
+    def release(self, rec):
+        self.released.append(rec)
+
+
+def test_vosk_decoder_keeps_every_segment_and_drops_unk():
+    pool = FakePool()
+    decoder = VoskDecoder(pool)
+    decoder.feed(AUDIO)
+    decoder.feed(AUDIO)
+
+    text, confidence = decoder.finish()
+
+    assert text == "copy file report"
+    assert confidence == pytest.approx(0.8)
+    decoder.close()
+    assert len(pool.released) == 1
+
+
+def test_fallback_leaves_half_open_backup_alone_while_primary_answers():
+    primary = StubBackend("list files", name="primary")
+    router = RecognizerRouter([primary, StubBackend("ok", name="backup")], breaker_failures=1, breaker_reset=0.05)
+    router.breakers["backup"].record_failure()
+    time.sleep(0.06)
+
+    for _ in range(3):
+        assert router.transcribe(AUDIO).backend == "primary"
+
+    # Its one trial is still available for when the primary fails
+    assert router.breakers["backup"].state == "half-open"
+    primary.error = RuntimeError("offline")
+    assert router.transcribe(AUDIO).backend == "backup"
+    assert router.breakers["backup"].state == "closed"
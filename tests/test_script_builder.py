@@ -0,0 +1,68 @@
+import os
+import sys
+
+import pytest
+
+from vocalshell.script_builder import ScriptCompiler
+from vocalshell.session import Session
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("USERPROFILE", str(tmp_path))
+    return tmp_path
+
+
+def test_posix_script_resolves_folder_aliases(home):
+    script = ScriptCompiler(is_windows=False).compile(["cd downloads", "ls", "  ", "cd ~/src"])
+
+    assert script == f"#!/bin/sh\nset -e\ncd {home / 'Downloads'}\nls\ncd ~/src\n"
+
+
+def test_alias_paths_are_quoted(tmp_path, monkeypatch):
+    home = tmp_path / "my home"
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setenv("USERPROFILE", str(home))
+
+    script = ScriptCompiler(is_windows=False, stop_on_error=False).compile(["cd desktop"])
+
+    assert script == f"#!/bin/sh\ncd '{home / 'Desktop'}'\n"
+
+
+def test_batch_script_checks_each_command(home):
+    script = ScriptCompiler(is_windows=True).compile(["cd /d documents", "dir"])
+
+    assert script.split("\r\n") == [
+        "@echo off",
+        f'cd /d "{home / "Documents"}"',
+        "if errorlevel 1 exit /b %errorlevel%",
+        "dir",
+        "if errorlevel 1 exit /b %errorlevel%",
+        "",
+    ]
+
+
+def test_write_adds_extension_and_marks_executable(tmp_path):
+    compiler = ScriptCompiler(is_windows=False)
+
+    path = compiler.write(compiler.compile(["ls"]), str(tmp_path / "out" / "job"))
+
+    assert path.endswith("job.sh")
+    if sys.platform != "win32":
+        assert os.access(path, os.X_OK)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="runs /bin/sh")
+def test_run_stays_in_the_script(tmp_path):
+    (tmp_path / "sub").mkdir()
+    session = Session(cwd=str(tmp_path))
+    compiler = ScriptCompiler(is_windows=False)
+
+    success, output = compiler.run(compiler.compile(["cd sub", "pwd"]), session)
+
+    assert success and output == str(tmp_path / "sub")
+    assert session.cwd == str(tmp_path)
+
+    success, output = compiler.run(compiler.compile(["false", "echo unreachable"]), session)
+    assert not success and "unreachable" not in output
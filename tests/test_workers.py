@@ -0,0 +1,78 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+
+import pytest
+
+from vocalshell import workers
+from vocalshell.workers import ServerBusy, WorkerPools
+
+needs_fork = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="decoders are patched in a forked child"
+)
+
+
+def crash(data):
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def echo(data):
+    return data.decode()
+
+
+class FakeRegistry:
+    """Stands in for the Vosk model registry inside the decoder processes."""
+
+    def is_loaded(self, model_path):
+        return True
+
+    def get_pool(self, model_path, sample_rate, size):
+        return None
+
+    def warmup(self, paths):
+        pass
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    monkeypatch.setattr(workers, "get_model_registry", FakeRegistry)
+    pools = WorkerPools({"decode_workers": 1, "exec_workers": 1, "max_queue": 0, "max_streams": 1})
+    yield pools
+    pools.shutdown()
+
+
+@needs_fork
+def test_dead_decoder_is_replaced_and_request_falls_back(pools, monkeypatch):
+    monkeypatch.setattr(workers, "_decode_in_worker", crash)
+    broken = pools.decode_pool
+
+    async def decode_three():
+        return await asyncio.gather(*(pools.decode(b"audio", lambda data: "fallback") for _ in range(3)))
+
+    assert asyncio.run(decode_three()) == ["fallback"] * 3
+    assert pools.decode_pool is not broken
+
+    monkeypatch.setattr(workers, "_decode_in_worker", echo)
+    assert asyncio.run(pools.decode(b"audio")) == "audio"
+
+
+def test_streams_have_their_own_limit(pools):
+    with pools.stream_admission():
+        with pytest.raises(ServerBusy):
+            with pools.stream_admission():
+                pass
+        # An open stream does not take the only request slot
+        with pools.admission():
+            pass
+    with pools.stream_admission():
+        pass
+
+
+def test_memory_lists_each_decoder(pools):
+    pids = pools.start_decoders()
+
+    report = pools.memory()
+
+    assert [entry["role"] for entry in report] == ["server"] + ["decoder"] * len(pids)
+    assert [entry["pid"] for entry in report[1:]] == pids
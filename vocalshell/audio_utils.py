@@ -1,13 +1,219 @@
 import os
 import platform
 import logging
+import struct
 import subprocess
+import threading
+import wave
+from collections import namedtuple
+
+try:
+    import audioop
+except ImportError:  # Python 3.13+ without the audioop-lts backport
+    audioop = None
+
+try:
+    import numpy as np
+    import sounddevice as sd
+except (ImportError, OSError):  # OSError: PortAudio library not found
+    np = None
+    sd = None
 
 logger = logging.getLogger(__name__)
 
+WavInfo = namedtuple("WavInfo", ["sample_rate", "sample_width", "channels"])
+
+# The cues ship in assets/sounds at the top of the repository
+DEFAULT_SOUNDS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "sounds"
+)
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def parse_wav(buffer):
+    """Parse a RIFF/WAVE buffer without copying it.
+
+    Returns a ``WavInfo`` and a memoryview over the PCM ``data`` chunk.
+    """
+    view = memoryview(buffer).cast("B")
+    if len(view) < 12 or view[0:4] != b"RIFF" or view[8:12] != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE file")
+
+    info = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = view[offset:offset + 4].tobytes()
+        (chunk_size,) = struct.unpack_from("<I", view, offset + 4)
+        body = offset + 8
+
+        if chunk_id == b"fmt ":
+            fmt_tag, channels, rate = struct.unpack_from("<HHI", view, body)
+            (bits,) = struct.unpack_from("<H", view, body + 14)
+            if fmt_tag not in (_WAVE_FORMAT_PCM, _WAVE_FORMAT_EXTENSIBLE):
+                raise ValueError(f"Unsupported WAV encoding: {fmt_tag:#x}")
+            info = WavInfo(rate, bits // 8, channels)
+        elif chunk_id == b"data":
+            if info is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            # Streaming recorders often leave the size unset; clamp to what we have
+            return info, view[body:min(body + chunk_size, len(view))]
+
+        # Chunks are word aligned
+        offset = body + chunk_size + (chunk_size & 1)
+
+    raise ValueError("WAV file has no data chunk")
+
+
+def open_wav_stream(source, chunk_frames):
+    """Return ``(WavInfo, chunks)`` for a WAV given as bytes, a path or a file object.
+
+    In-memory buffers are sliced in place; paths and file objects are read
+    one chunk at a time so the whole file is never loaded.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        info, pcm = parse_wav(source)
+        step = chunk_frames * info.sample_width * info.channels
+        return info, (pcm[i:i + step] for i in range(0, len(pcm), step))
+
+    wav = wave.open(source, "rb")
+    info = WavInfo(wav.getframerate(), wav.getsampwidth(), wav.getnchannels())
+
+    def chunks():
+        try:
+            while True:
+                data = wav.readframes(chunk_frames)
+                if not data:
+                    break
+                yield data
+        finally:
+            wav.close()
+
+    return info, chunks()
+
+
+class PcmConverter:
+    """Converts raw PCM chunks to 16-bit mono at a target rate.
+
+    Each step is only applied when the source format actually differs, and
+    the resampler state is carried across chunks so streamed audio stays
+    continuous.
+    """
+
+    def __init__(self, sample_rate, sample_width, channels, target_rate=16000):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.channels = channels
+        self.target_rate = target_rate
+        self._ratecv_state = None
+
+        self.passthrough = (
+            sample_rate == target_rate and sample_width == 2 and channels == 1
+        )
+        if not self.passthrough and audioop is None:
+            raise RuntimeError("audioop is required to convert non 16 kHz/16-bit mono audio")
+
+    def convert(self, data):
+        if self.passthrough:
+            # The decoder wants bytes; this copies one chunk, not the upload
+            return data if isinstance(data, bytes) else bytes(data)
+
+        if self.sample_width == 1:
+            # 8-bit WAV samples are unsigned
+            data = audioop.bias(data, 1, -128)
+        if self.sample_width != 2:
+            data = audioop.lin2lin(data, self.sample_width, 2)
+        if self.channels == 2:
+            data = audioop.tomono(data, 2, 0.5, 0.5)
+        elif self.channels > 2:
+            raise ValueError(f"Unsupported channel count: {self.channels}")
+        if self.sample_rate != self.target_rate:
+            data, self._ratecv_state = audioop.ratecv(
+                data, 2, 1, self.sample_rate, self.target_rate, self._ratecv_state
+            )
+        return data
+
+
+class CueMixer:
+    """One persistent ``sounddevice`` output stream that plays in-memory cues.
+
+    The stream stays open and outputs silence between cues, so starting a
+    cue is just swapping a buffer; the audio callback does the rest. A new
+    cue replaces whatever is still playing.
+    """
+
+    def __init__(self, sample_rate, channels):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._buffer = None
+        self._pos = 0
+        self._lock = threading.Lock()
+        self._stream = sd.OutputStream(
+            samplerate=sample_rate, channels=channels, dtype="int16",
+            callback=self._callback
+        )
+        self._stream.start()
+
+    def play(self, samples):
+        with self._lock:
+            self._buffer = samples
+            self._pos = 0
+
+    def _callback(self, outdata, frames, time_info, status):
+        with self._lock:
+            buffer, pos = self._buffer, self._pos
+            if buffer is None:
+                outdata.fill(0)
+                return
+            chunk = buffer[pos:pos + frames]
+            outdata[:len(chunk)] = chunk
+            outdata[len(chunk):] = 0
+            self._pos = pos + len(chunk)
+            if self._pos >= len(buffer):
+                self._buffer = None
+
+    def close(self):
+        self._stream.stop()
+        self._stream.close()
+
+
+def decode_cue(path, sample_rate=None):
+    """Read a WAV file into an int16 ``(frames, channels)`` array.
+
+    Returns ``(samples, sample_rate)``; with ``sample_rate`` given the
+    audio is resampled to it.
+    """
+    with open(path, "rb") as f:
+        info, pcm = parse_wav(f.read())
+    data = pcm.tobytes()
+    rate = info.sample_rate
+    if info.sample_width != 2:
+        if audioop is None:
+            raise RuntimeError(f"audioop is required to decode {info.sample_width * 8}-bit audio")
+        if info.sample_width == 1:
+            data = audioop.bias(data, 1, -128)
+        data = audioop.lin2lin(data, info.sample_width, 2)
+    if sample_rate and sample_rate != rate:
+        if audioop is None:
+            raise RuntimeError("audioop is required to resample audio")
+        data, _ = audioop.ratecv(data, 2, info.channels, rate, sample_rate, None)
+        rate = sample_rate
+    samples = np.frombuffer(data, dtype=np.int16).reshape(-1, info.channels)
+    return samples, rate
+
 
 class AudioPlayer:
-    def __init__(self, assets_path="vocalshell/assets/sounds"):
+    """Plays the UI cue sounds without blocking the caller.
+
+    Cues are decoded into memory once and played through a single
+    persistent ``sounddevice`` stream. Without ``sounddevice`` (or an
+    output device) it falls back to ``winsound`` on Windows or to
+    ``paplay``/``aplay``/``afplay`` started in the background; a player
+    that turns out to be missing or failing is not tried again.
+    """
+
+    def __init__(self, assets_path=DEFAULT_SOUNDS_PATH):
         self.assets_path = assets_path
 
         # FILES REQUIRED
@@ -22,52 +228,100 @@ class AudioPlayer:
             for f in self.required_sounds
         )
 
-        #if not self.sounds_available:
-            #logger.warning(f"Some sound files missing in: {self.assets_path}")
+        self.cues = {}
+        # Seconds each cue lasts, so listening can skip over it
+        self.durations = {}
+        self.mixer = None
+        self.system = platform.system()
+        if self.system == "Darwin":
+            self.players = ["afplay"]
+        else:
+            self.players = ["paplay", "aplay"]
+        # Players that were missing or exited with an error
+        self.failed_players = set()
+        self._last_player = None
+
+        if self.sounds_available:
+            for name in self.required_sounds:
+                try:
+                    with wave.open(os.path.join(self.assets_path, name), "rb") as wav:
+                        self.durations[name] = wav.getnframes() / wav.getframerate()
+                except (OSError, wave.Error, EOFError):
+                    pass
+            self._load_cues()
+
+    def _load_cues(self):
+        if sd is None or np is None:
+            return
+        rate = None
+        for name in self.required_sounds:
+            path = os.path.join(self.assets_path, name)
+            try:
+                # All cues share the first cue's rate so one stream plays them all
+                self.cues[name], rate = decode_cue(path, rate)
+            except Exception as e:
+                logger.warning(f"Could not decode sound {path}: {e}")
+        if not self.cues:
+            return
+        channels = max(cue.shape[1] for cue in self.cues.values())
+        for name, cue in self.cues.items():
+            if cue.shape[1] < channels:
+                self.cues[name] = np.repeat(cue, channels, axis=1)
+        try:
+            self.mixer = CueMixer(rate, channels)
+        except Exception as e:
+            logger.warning(f"No audio output stream, falling back to a player: {e}")
+            self.mixer = None
 
     def play_sound(self, name: str):
-        """Cross-platform audio playback with safe fallback."""
+        """Start playing a cue and return immediately."""
         if not self.sounds_available:
-             #logger.warning("Sound assets missing, skipping playback.")
             return False
 
-        path = os.path.join(self.assets_path, name)
+        if self.mixer is not None and name in self.cues:
+            self.mixer.play(self.cues[name])
+            return True
 
+        path = os.path.join(self.assets_path, name)
         if not os.path.exists(path):
-             #logger.error(f"Sound file not found: {path}")
             return False
 
-        try:
-            system = platform.system()
+        if self.system == "Windows":
+            try:
+                import winsound
+            except Exception:
+                return False
+            winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+            return True
+        return self._spawn_player(path)
 
-            # WINDOWS
-            if system == "Windows":
-                try:
-                    import winsound
-                except Exception as e:
-                     #logger.error(f"winsound unavailable: {e}")
-                    return False
-
-                winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
-                return True
-
-            # MACOS
-            elif system == "Darwin":
-                subprocess.run(["afplay", path], check=False)
-                return True
-
-            # LINUX
-            else:
-                # Try paplay
-                result = subprocess.run(["paplay", path], check=False)
-                if result.returncode != 0:
-                    # Try a fallback player
-                    subprocess.run(["aplay", path], check=False)
-                return True
+    def _spawn_player(self, path):
+        # A player that failed on the previous cue is not tried again
+        if self._last_player is not None:
+            player, proc = self._last_player
+            if proc.poll() not in (None, 0):
+                logger.warning(f"{player} failed (exit code {proc.returncode}), not using it again")
+                self.failed_players.add(player)
+            self._last_player = None
 
-        except Exception as e:
-             #logger.error(f"Error playing sound: {e}")
-            return False
+        for player in self.players:
+            if player in self.failed_players:
+                continue
+            try:
+                proc = subprocess.Popen(
+                    [player, path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+            except OSError:
+                self.failed_players.add(player)
+                continue
+            self._last_player = (player, proc)
+            return True
+        return False
+
+    def close(self):
+        if self.mixer is not None:
+            self.mixer.close()
+            self.mixer = None
 
 
 # -------------------------------------------------------------------------
@@ -84,7 +338,11 @@ def get_audio_player():
 
 
 def play_listen_sound():
-    return get_audio_player().play_sound("listen_start.wav")
+    """Start the listen cue; returns how many seconds it plays (0 if it doesn't)."""
+    player = get_audio_player()
+    if not player.play_sound("listen_start.wav"):
+        return 0
+    return player.durations.get("listen_start.wav", 0)
 
 
 def play_success_sound():
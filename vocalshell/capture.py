@@ -0,0 +1,171 @@
+import logging
+import threading
+
+try:
+    import numpy as np
+    import sounddevice as sd
+except (ImportError, OSError):  # OSError: PortAudio library not found
+    np = None
+    sd = None
+
+from vocalshell.vad import FRAME_BYTES, SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+FRAME_SAMPLES = FRAME_BYTES // 2
+
+
+class AudioRing:
+    """Fixed-size ring of 16-bit samples, preallocated once.
+
+    Positions are absolute sample counts since the ring was created, so a
+    reader can tell how far behind it is; anything older than
+    ``capacity`` samples has been overwritten.
+    """
+
+    def __init__(self, seconds=30, sample_rate=SAMPLE_RATE):
+        self.capacity = int(seconds * sample_rate)
+        self.data = np.zeros(self.capacity, dtype=np.int16)
+        self.written = 0
+        self._cond = threading.Condition()
+
+    def write(self, samples):
+        """Copy ``samples`` in; only slices of existing arrays, no new buffers."""
+        n = len(samples)
+        if n > self.capacity:
+            samples = samples[n - self.capacity:]
+            skipped, n = n - self.capacity, self.capacity
+        else:
+            skipped = 0
+        start = (self.written + skipped) % self.capacity
+        first = min(n, self.capacity - start)
+        self.data[start:start + first] = samples[:first]
+        if first < n:
+            self.data[:n - first] = samples[first:]
+        with self._cond:
+            self.written += skipped + n
+            self._cond.notify_all()
+
+    def oldest(self):
+        return max(0, self.written - self.capacity)
+
+    def read(self, position, out, timeout=None):
+        """Fill ``out`` with the samples starting at ``position``.
+
+        Waits until they have been captured. Returns the position actually
+        read from, which is later than ``position`` if that was already
+        overwritten, or None on timeout.
+        """
+        n = len(out)
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.written >= max(position, self.oldest()) + n, timeout):
+                return None
+            position = max(position, self.oldest())
+        start = position % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self.data[start:start + first]
+        if first < n:
+            out[first:] = self.data[:n - first]
+        return position
+
+
+class MicrophoneCapture:
+    """Records the microphone continuously into an ``AudioRing``.
+
+    PortAudio calls ``_callback`` on its own thread for every block; the
+    callback only copies into the ring, so nothing is allocated per block
+    and nothing said between commands is lost. ``frames()`` picks up
+    where the previous call stopped; ``skip_idle()`` drops a backlog that
+    turned out to be silence.
+    """
+
+    def __init__(self, seconds=30, sample_rate=SAMPLE_RATE, device=None):
+        self.sample_rate = sample_rate
+        self.device = device
+        self.ring = AudioRing(seconds, sample_rate)
+        self.position = 0
+        self.overflows = 0
+        # Sample range never handed out, e.g. while a cue plays
+        self._muted = (0, 0)
+        self._frame = np.empty(FRAME_SAMPLES, dtype=np.int16)
+        self._stream = None
+
+    @staticmethod
+    def available():
+        return sd is not None
+
+    def start(self):
+        if self._stream is None:
+            self._stream = sd.InputStream(
+                samplerate=self.sample_rate, channels=1, dtype="int16",
+                blocksize=FRAME_SAMPLES, device=self.device, callback=self._callback
+            )
+            self._stream.start()
+            self.position = self.ring.written
+        return self
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def _callback(self, indata, frames, time_info, status):
+        if status.input_overflow:
+            self.overflows += 1
+        self.ring.write(indata[:, 0])
+
+    def mute(self, seconds):
+        """Drop the next ``seconds`` of audio, counted from the live edge.
+
+        For sound we play ourselves: it is recorded like anything else
+        but must never be mistaken for the start of an utterance.
+        """
+        start = self.ring.written
+        self._muted = (start, start + int(seconds * self.sample_rate))
+
+    def _is_muted(self, position):
+        start, end = self._muted
+        return position < end and position + FRAME_SAMPLES > start
+
+    def skip_idle(self, is_speech, keep=0, run=1):
+        """Drop unread audio that holds no speech.
+
+        Moves the read position to ``keep`` frames before the first ``run``
+        voiced frames in a row of the backlog, or to ``keep`` frames before
+        the live edge if there are none. Without this, silence buffered
+        during a long command would be endpointed frame by frame as if it
+        were arriving now.
+        """
+        end = self.ring.written
+        position = max(self.position, self.ring.oldest())
+        frame = np.empty(FRAME_SAMPLES, dtype=np.int16)
+        voiced = 0
+        target = end
+        while position + FRAME_SAMPLES <= end:
+            position = self.ring.read(position, frame, 0)
+            if position is None:
+                break
+            voiced = voiced + 1 if not self._is_muted(position) and is_speech(frame.tobytes()) else 0
+            if voiced >= run:
+                target = position - (run - 1) * FRAME_SAMPLES
+                break
+            position += FRAME_SAMPLES
+        skipped = target - keep * FRAME_SAMPLES - self.position
+        if skipped > 0:
+            self.position += skipped
+        return max(0, skipped) // FRAME_SAMPLES
+
+    def frames(self, timeout=2.0):
+        """Yield 30 ms frames as bytes, oldest unread first.
+
+        Raises ``OSError`` if no audio arrives within ``timeout`` seconds,
+        e.g. because the device was unplugged.
+        """
+        while True:
+            position = self.ring.read(self.position, self._frame, timeout)
+            if position is None:
+                raise OSError("No audio from the microphone")
+            self.position = position + FRAME_SAMPLES
+            if not self._is_muted(position):
+                yield self._frame.tobytes()
@@ -6,45 +6,83 @@ import subprocess
 import os
 import platform
 import logging
-import pyttsx3
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 import re
 import shlex
+import queue
+import threading
+import time
+from vocalshell.session import Session, resolve_cd_target
+from vocalshell.tts import SpeechWorker
 
 logger = logging.getLogger(__name__)
 
+
+class OutputCap:
+    """Counts streamed output bytes and cuts lines off once ``limit`` is reached."""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.used = 0
+        self.truncated = False
+        self._notified = False
+
+    def take(self, line):
+        """Return the part of ``line`` that still fits, or None once the cap is hit."""
+        if not self.limit:
+            return line
+        if self.truncated:
+            return None
+        data = line.encode("utf-8", "replace")
+        # The newline after a line that exactly filled the cap can push
+        # ``used`` one past the limit
+        room = max(0, self.limit - self.used)
+        if room and len(data) <= room:
+            self.used += len(data) + 1
+            return line
+        self.truncated = True
+        self.used = self.limit
+        return data[:room].decode("utf-8", "ignore") or None
+
+    def notice(self):
+        """Return the truncation marker the first time it is due, else None."""
+        if self.truncated and not self._notified:
+            self._notified = True
+            return f"[output truncated after {self.limit} bytes]"
+        return None
+
+
 class CommandExecutor:
     def __init__(self, config=None):
         self.console = Console()
         self.config = config or {}
         self.is_windows = platform.system() == "Windows"
-        try:
-            self.tts_engine = pyttsx3.init()
-            self.tts_engine.setProperty("rate", self.config.get("tts_rate", 150))
-            self.tts_engine.setProperty("volume", self.config.get("tts_volume", 1.0))
-        except:
-            self.tts_engine = None
+        # Used when no session is passed, e.g. by the single-user CLI
+        self.session = Session()
+        # Speech runs on its own thread; speak() only queues
+        self.tts = SpeechWorker.from_config(self.config)
 
     # ==============================
     # Universal read_file with extension fallback
     # ==============================
-    def read_file(self, file_name, assets_path="vocalshell/assets", play_audio=True):
+    def read_file(self, file_name, assets_path="vocalshell/assets", play_audio=True, session=None):
         """
         Reads any file. Automatically tries adding common extensions (.txt, .csv, .log, .md, .py)
         """
+        cwd = (session or self.session).cwd
         possible_paths = []
 
         # 1️⃣ Exact name in current working directory
-        possible_paths.append(os.path.join(os.getcwd(), file_name))
+        possible_paths.append(os.path.join(cwd, file_name))
         # 2️⃣ Exact name in assets folder
         possible_paths.append(os.path.join(assets_path, file_name))
 
         # 3️⃣ Add common extensions if not provided
         if not os.path.splitext(file_name)[1]:
             for ext in [".txt", ".csv", ".log", ".md", ".py"]:
-                possible_paths.append(os.path.join(os.getcwd(), file_name + ext))
+                possible_paths.append(os.path.join(cwd, file_name + ext))
                 possible_paths.append(os.path.join(assets_path, file_name + ext))
 
         # Find first existing file
@@ -73,71 +111,71 @@ class CommandExecutor:
         except Exception:
             return f"Binary file (cannot display content): {file_name}"
 
+    # ==============================
+    # Built-in commands (cd, export/set)
+    # ==============================
+    def _run_builtin(self, command, session):
+        """Handle commands that change session state. Returns None for anything else."""
+        # ------------------------------
+        # Handle change directory (cd)
+        # ------------------------------
+        if command.lower().startswith("cd "):
+            path = command[3:].strip()
+            if self.is_windows and path.lower().startswith("/d "):
+                path = path[3:].strip()
+            path = resolve_cd_target(path, self.is_windows, session.env.get("HOME"))
+
+            # Only this session moves; the server process cwd never changes
+            session.chdir(path)
+            return True, f"Changed directory to {session.cwd}"
+
+        # ------------------------------
+        # Handle environment variables (export / set)
+        # ------------------------------
+        env_match = re.match(r"(?:export|set)\s+(\w+)=(.*)$", command.strip(), re.IGNORECASE)
+        if env_match:
+            name, value = env_match.group(1), env_match.group(2).strip().strip('"')
+            session.env[name] = value
+            return True, f"Set {name}={value}"
+
+        return None
+
+    def changes_session(self, command):
+        """True for commands that change the session's cwd or environment."""
+        command = command.strip().lower()
+        return command.startswith("cd ") or bool(re.match(r"(?:export|set)\s+\w+=", command))
+
+    def _match_read_file(self, command):
+        read_patterns = [
+            r"read (.*)",
+            r"read file (.*)",
+            r"display file (.*)",
+            r"open (.*) and read",
+            r"padho (.*)"
+        ]
+
+        for pattern in read_patterns:
+            match = re.match(pattern, command, re.IGNORECASE)
+            if match:
+                return match.group(1).strip()
+        return None
+
     # ==============================
     # execute_command updated
     # ==============================
-    def execute_command(self, command, metadata):
+    def execute_command(self, command, metadata, session=None):
+        session = session or self.session
         try:
-            # ------------------------------
-            # Handle change directory (cd)
-            # ------------------------------
-            if command.lower().startswith("cd "):
-                path = command[3:].strip()
-                if self.is_windows and path.lower().startswith("/d "):
-                    path = path[3:].strip()
-                if self.is_windows:
-                    from pathlib import Path
-                    user_home = Path.home()
-                    onedrive_base = user_home / "OneDrive"
-
-                    lower_path = path.lower()
-                    if lower_path == "desktop":
-                        desktop_path = onedrive_base / "Desktop" if (onedrive_base / "Desktop").exists() else user_home / "Desktop"
-                        path = str(desktop_path)
-                    elif lower_path == "documents":
-                        documents_path = onedrive_base / "Documents" if (onedrive_base / "Documents").exists() else user_home / "Documents"
-                        path = str(documents_path)
-                    elif lower_path == "downloads":
-                        path = str(user_home / "Downloads")
-                    elif lower_path == "pictures":
-                        pictures_path = onedrive_base / "Pictures" if (onedrive_base / "Pictures").exists() else user_home / "Pictures"
-                        path = str(pictures_path)
-                else:
-                    from pathlib import Path
-                    home = Path.home()
-                    lower_path = path.lower()
-                    if lower_path == "desktop":
-                        path = str(home / "Desktop")
-                    elif lower_path == "documents":
-                        path = str(home / "Documents")
-                    elif lower_path == "downloads":
-                        path = str(home / "Downloads")
-                    elif lower_path == "pictures":
-                        path = str(home / "Pictures")
-
-                os.chdir(path)
-                return True, f"Changed directory to {os.getcwd()}"
+            builtin = self._run_builtin(command, session)
+            if builtin is not None:
+                return builtin
 
             # ------------------------------
             # Handle read_file commands
             # ------------------------------
-            read_patterns = [
-                r"read (.*)",
-                r"read file (.*)",
-                r"display file (.*)",
-                r"open (.*) and read",
-                r"padho (.*)"
-            ]
-
-            file_name = None
-            for pattern in read_patterns:
-                match = re.match(pattern, command, re.IGNORECASE)
-                if match:
-                    file_name = match.group(1).strip()
-                    break
-
+            file_name = self._match_read_file(command)
             if file_name:
-                content = self.read_file(file_name)  # Works for any file with extension fallback
+                content = self.read_file(file_name, session=session)  # Works for any file with extension fallback
                 use_tts = not content.startswith("Binary file") and not content.startswith("Played audio")
                 self.display_result(f"Reading {file_name}", True, content, metadata, use_tts=use_tts)
                 return True, content
@@ -150,7 +188,9 @@ class CommandExecutor:
                 shell=True,
                 capture_output=True,
                 text=True,
-                timeout=30
+                timeout=30,
+                cwd=session.cwd,
+                env=session.env
             )
 
             if result.returncode == 0:
@@ -161,6 +201,109 @@ class CommandExecutor:
         except Exception as e:
             return False, str(e)
 
+    # ==============================
+    # stream_command: incremental output
+    # ==============================
+    def stream_command(self, command, metadata, session=None):
+        """Run ``command`` and yield ``(stream, line)`` as output arrives.
+
+        ``stream`` is ``"stdout"`` or ``"stderr"``; the last item is always
+        ``("exit", returncode)``. At most ``max_output_length`` bytes of output
+        are yielded, after which the process keeps running but is drained
+        silently.
+        """
+        session = session or self.session
+        limit = self.config.get("max_output_length")
+        timeout = self.config.get("timeout", 30)
+
+        try:
+            builtin = self._run_builtin(command, session)
+            file_name = None if builtin else self._match_read_file(command)
+        except Exception as e:
+            yield "stderr", str(e)
+            yield "exit", 1
+            return
+
+        if builtin is not None or file_name:
+            if builtin is not None:
+                success, output = builtin
+            else:
+                try:
+                    success, output = True, self.read_file(file_name, play_audio=False, session=session)
+                except Exception as e:
+                    success, output = False, str(e)
+            capped = OutputCap(limit)
+            for line in output.splitlines():
+                line = capped.take(line)
+                if line is not None:
+                    yield ("stdout" if success else "stderr"), line
+                if capped.truncated:
+                    yield "stderr", capped.notice()
+                    break
+            yield "exit", 0 if success else 1
+            return
+
+        try:
+            proc = subprocess.Popen(
+                command,
+                shell=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+                cwd=session.cwd,
+                env=session.env
+            )
+        except Exception as e:
+            yield "stderr", str(e)
+            yield "exit", 1
+            return
+
+        lines = queue.Queue()
+
+        def pump(pipe, name):
+            try:
+                for line in pipe:
+                    lines.put((name, line.rstrip("\r\n")))
+            finally:
+                pipe.close()
+                lines.put((name, None))
+
+        for pipe, name in ((proc.stdout, "stdout"), (proc.stderr, "stderr")):
+            threading.Thread(target=pump, args=(pipe, name), daemon=True).start()
+
+        capped = OutputCap(limit)
+        deadline = time.monotonic() + timeout
+        open_pipes = 2
+        try:
+            while open_pipes:
+                try:
+                    name, line = lines.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    proc.kill()
+                    yield "stderr", f"Command timed out after {timeout} seconds"
+                    yield "exit", -1
+                    return
+                if line is None:
+                    open_pipes -= 1
+                    continue
+                line = capped.take(line)
+                if line is not None:
+                    yield name, line
+                notice = capped.notice()
+                if notice:
+                    yield "stderr", notice
+            yield "exit", proc.wait(timeout=max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            yield "stderr", f"Command timed out after {timeout} seconds"
+            yield "exit", -1
+        finally:
+            # Also reached when the consumer stops early (client disconnected)
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+
     # ==============================
     # display_result unchanged
     # ==============================
@@ -168,9 +311,18 @@ class CommandExecutor:
         style = "green" if success else "red"
         self.console.print(Panel(Text(output, style=style), title=command, border_style=style))
 
-        if use_tts and self.tts_engine:
-            self.tts_engine.say(output)
-            self.tts_engine.runAndWait()
+        if use_tts:
+            self.speak(output)
+
+    def speak(self, text):
+        """Queue ``text`` for speech and return without waiting for it."""
+        return self.tts.say(text)
+
+    def stop_speaking(self):
+        self.tts.interrupt()
+
+    def is_speaking(self):
+        return self.tts.speaking
 
 
 # ==============================
@@ -0,0 +1,67 @@
+import os
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigWatcher:
+    """Polls a file's mtime/size on a daemon thread and calls ``on_change``.
+
+    A change is only reported once the file has looked the same for one
+    whole interval, so an editor that is still writing it is not picked up
+    half way through.
+    """
+
+    def __init__(self, path, on_change, interval=1.0):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self._seen = self._signature()
+        self._pending = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _signature(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="vocalshell-config-watcher", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def poll(self):
+        """Check once; returns True if ``on_change`` was called."""
+        current = self._signature()
+        if current == self._seen or current is None:
+            self._pending = None
+            return False
+        if current != self._pending:
+            # Changed since last look; wait for it to settle
+            self._pending = current
+            return False
+
+        self._seen = current
+        self._pending = None
+        try:
+            self.on_change()
+        except Exception as e:
+            logger.error(f"Reload of {self.path} failed: {e}")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
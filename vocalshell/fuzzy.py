@@ -0,0 +1,101 @@
+import heapq
+from collections import defaultdict
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_distance(a, b, limit):
+    """Levenshtein distance between ``a`` and ``b``, or ``limit + 1`` once it
+    is certain to exceed ``limit``.
+
+    Only the diagonal band of width ``2 * limit + 1`` is computed, so the cost
+    is O(len(a) * limit) instead of O(len(a) * len(b)).
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+
+    over = limit + 1
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        lo = max(1, i - limit)
+        hi = min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= limit else over
+        row_min = current[0]
+        ca = a[i - 1]
+        for j in range(lo, hi + 1):
+            cost = 0 if ca == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return over
+        previous = current
+    return min(previous[len(b)], over)
+
+
+class TrigramIndex:
+    """Character-trigram inverted index over short phrases.
+
+    ``search`` only visits the posting lists of the query's own trigrams, so
+    the cost follows how many phrases share trigrams with the query rather
+    than the total number of phrases. Candidates are ranked by trigram
+    overlap and the best ``k`` are rescored with a bounded edit distance.
+    """
+
+    def __init__(self):
+        self.phrases = []
+        self.keys = []
+        self._sizes = []
+        self._postings = defaultdict(list)
+
+    def add(self, phrase, key):
+        slot = len(self.phrases)
+        grams = trigrams(phrase)
+        self.phrases.append(phrase)
+        self.keys.append(key)
+        self._sizes.append(len(grams))
+        for gram in grams:
+            self._postings[gram].append(slot)
+
+    def candidates(self, text, k=8):
+        """Return up to ``k`` ``(overlap, slot)`` pairs, best first."""
+        grams = trigrams(text)
+        shared = defaultdict(int)
+        for gram in grams:
+            for slot in self._postings.get(gram, ()):
+                shared[slot] += 1
+        # Jaccard overlap of the two trigram sets
+        scored = (
+            (count / (len(grams) + self._sizes[slot] - count), slot)
+            for slot, count in shared.items()
+        )
+        return heapq.nlargest(k, scored)
+
+    def search(self, text, threshold=0.7, k=8):
+        """Return ``(similarity, key)`` for the closest phrase, or None.
+
+        Similarity is ``1 - distance / longer length``; anything below
+        ``threshold`` is rejected without finishing the distance computation.
+        """
+        best = None
+        for _, slot in self.candidates(text, k):
+            phrase = self.phrases[slot]
+            longest = max(len(text), len(phrase)) or 1
+            limit = int(longest * (1 - threshold))
+            distance = bounded_distance(text, phrase, limit)
+            if distance > limit:
+                continue
+            similarity = 1 - distance / longest
+            if best is None or similarity > best[0] or (similarity == best[0] and slot < best[2]):
+                best = (similarity, self.keys[slot], slot)
+        return None if best is None else best[:2]
+
+    def __len__(self):
+        return len(self.phrases)
@@ -0,0 +1,101 @@
+import re
+import logging
+from collections import namedtuple
+
+from vocalshell.fuzzy import TrigramIndex
+
+logger = logging.getLogger(__name__)
+
+# A pattern's literal words are what is left once regex groups and
+# metacharacters are removed: "copy file (.*) to (.*)" -> copy, file, to
+_REGEX_SYNTAX = re.compile(r"\((?:[^()\\]|\\.)*\)|\\.|[.*+?^$|\[\]{}]")
+_TOKEN = re.compile(r"\w+")
+
+GrammarMatch = namedtuple("GrammarMatch", ["rule", "match", "score"])
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+class GrammarRule:
+    """One pattern of one command category, compiled once."""
+
+    __slots__ = ("category", "mapping", "pattern", "regex", "literals", "specificity", "order")
+
+    def __init__(self, category, mapping, pattern, order):
+        self.category = category
+        self.mapping = mapping
+        self.pattern = pattern
+        self.regex = re.compile(pattern)
+        self.literals = tokenize(_REGEX_SYNTAX.sub(" ", pattern))
+        # More fixed text means a more specific pattern: "show file (.*) page
+        # by page" should beat "show file" when both match
+        self.specificity = sum(len(word) for word in self.literals)
+        self.order = order
+
+
+class CompiledGrammar:
+    """All command patterns compiled and indexed by their first literal word.
+
+    ``match`` only tries rules whose first literal word is a word of the
+    input and picks the most specific regex match. Otherwise it falls back
+    to a trigram index over each pattern's literal words ("copy file (.*)
+    to (.*)" is indexed as "copy file to"), not over its regex source.
+    """
+
+    def __init__(self, command_mappings, fuzzy_threshold=0.7, fuzzy_candidates=8):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.fuzzy_candidates = fuzzy_candidates
+        self.rules = []
+        self.phrases = TrigramIndex()
+        self._index = {}
+        self._unanchored = []
+
+        for category, mapping in command_mappings.items():
+            for pattern in mapping.get("patterns", []):
+                try:
+                    rule = GrammarRule(category, mapping, pattern, len(self.rules))
+                except re.error as e:
+                    logger.warning(f"Skipping invalid pattern {pattern!r} in {category}: {e}")
+                    continue
+                self.rules.append(rule)
+                if rule.literals:
+                    self._index.setdefault(rule.literals[0], []).append(rule)
+                    self.phrases.add(" ".join(rule.literals), rule)
+                else:
+                    self._unanchored.append(rule)
+
+    def candidates(self, tokens):
+        found = list(self._unanchored)
+        for token in set(tokens):
+            found.extend(self._index.get(token, ()))
+        return found
+
+    def match(self, text):
+        """Return the best ``GrammarMatch`` for normalized ``text``, or None."""
+        tokens = tokenize(text)
+
+        best = None
+        for rule in self.candidates(tokens):
+            # Cheap substring test before running the regex
+            if not all(word in text for word in rule.literals):
+                continue
+            found = rule.regex.search(text)
+            if found is None:
+                continue
+            if best is None or (rule.specificity, -rule.order) > (best.rule.specificity, -best.rule.order):
+                best = GrammarMatch(rule, found, 1.0)
+        if best is not None:
+            return best
+
+        # A misheard word can be the first one, so the fuzzy pass searches
+        # every pattern's phrase rather than the first-word candidates
+        found = self.phrases.search(" ".join(tokens), self.fuzzy_threshold, self.fuzzy_candidates)
+        if found is None:
+            return None
+        similarity, rule = found
+        return GrammarMatch(rule, None, similarity)
+
+    def __len__(self):
+        return len(self.rules)
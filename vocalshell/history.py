@@ -0,0 +1,420 @@
+import os
+import re
+import json
+import heapq
+import bisect
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+def parse_time(value):
+    """Accept a datetime, an epoch number or an ISO string.
+
+    Always returns naive local time, the form timestamps are stored in;
+    "2026-01-01T00:00:00Z" is converted rather than compared as is.
+    """
+    if value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value)
+    if not isinstance(value, datetime):
+        try:
+            return datetime.fromtimestamp(float(value))
+        except ValueError:
+            # fromisoformat only accepts a trailing Z from Python 3.11
+            value = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+
+_TERM = re.compile(r"\w+")
+
+
+class HistoryIndex:
+    """In-memory search index over every stored history entry.
+
+    Each word of ``original`` and ``command`` maps to an ascending list of
+    entry ids (ids only ever grow, so adding is an append). A sorted word
+    list answers prefix lookups with ``bisect``, and per-session id lists
+    give "the Nth most recent" directly. Searches walk the rarest word's
+    postings from the newest end and check the other words against each
+    candidate's own word set, so they never build or intersect large sets.
+
+    At most ``max_entries`` are kept; past that (plus 25% slack, so the
+    rebuild cost is amortised) the oldest are dropped. Not thread-safe:
+    query it through ``HistoryStore``, which holds its lock.
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self.entries = {}
+        self._ids = []
+        self._by_session = {}
+        self._postings = {}
+        self._terms = []
+        self._words = {}
+
+    def _rebuild(self):
+        keep = [self.entries[i] for i in self._ids[-self.max_entries:]]
+        self.__init__(self.max_entries)
+        for entry in keep:
+            self.add(entry)
+
+    def add(self, entry):
+        entry_id = entry.get("id")
+        if entry_id is None or entry_id in self.entries:
+            return
+        self.entries[entry_id] = entry
+        self._ids.append(entry_id)
+        session_id = entry.get("session_id")
+        if session_id:
+            self._by_session.setdefault(session_id, []).append(entry_id)
+
+        text = f"{entry.get('original') or ''} {entry.get('command') or ''}".lower()
+        words = frozenset(_TERM.findall(text))
+        self._words[entry_id] = words
+        for term in words:
+            postings = self._postings.get(term)
+            if postings is None:
+                self._postings[term] = [entry_id]
+                bisect.insort(self._terms, term)
+            else:
+                postings.append(entry_id)
+
+        if self.max_entries and len(self._ids) > self.max_entries * 1.25:
+            self._rebuild()
+
+    def recent(self, n=1, session_id=None):
+        """The ``n``-th most recent entry (1 = last), or None."""
+        ids = self._by_session.get(session_id, []) if session_id else self._ids
+        if n < 1 or n > len(ids):
+            return None
+        return self.entries[ids[-n]]
+
+    def prefix(self, prefix, limit=None):
+        """Indexed words starting with ``prefix``, alphabetically."""
+        start = bisect.bisect_left(self._terms, prefix)
+        found = []
+        for term in self._terms[start:]:
+            if not term.startswith(prefix) or (limit and len(found) >= limit):
+                break
+            found.append(term)
+        return found
+
+    def _postings_for(self, term, prefix=False):
+        # A complete word is taken as meant; only unknown words are expanded
+        if not prefix or term in self._postings:
+            return [self._postings[term]] if term in self._postings else []
+        return [self._postings[t] for t in self.prefix(term)]
+
+    def _matcher(self, term, prefix=False):
+        """Predicate telling whether an entry id contains ``term``."""
+        if not prefix or term in self._postings:
+            return lambda entry_id: term in self._words[entry_id]
+        return lambda entry_id: any(w.startswith(term) for w in self._words[entry_id])
+
+    def search(self, query, limit=10, session_id=None, since=None, until=None, prefix=True, partial=True):
+        """Newest entries matching the words of ``query``, best matches first.
+
+        Entries containing every word come first; if there are fewer than
+        ``limit`` and ``partial`` is True, entries matching the most words
+        fill the rest. The last word is treated as a prefix unless
+        ``prefix`` is False or it is itself an indexed word.
+        """
+        terms = _TERM.findall(query.lower())
+        if not terms:
+            return []
+        groups, matchers = [], []
+        for i, term in enumerate(terms):
+            as_prefix = prefix and i == len(terms) - 1
+            group = self._postings_for(term, as_prefix)
+            if group:
+                groups.append(group)
+                matchers.append(self._matcher(term, as_prefix))
+        if not groups or (not partial and len(groups) < len(terms)):
+            return []
+
+        def allowed(entry_id):
+            entry = self.entries[entry_id]
+            if session_id and entry.get("session_id") != session_id:
+                return False
+            if since or until:
+                stamp = parse_time(entry.get("timestamp"))
+                if since and stamp < since:
+                    return False
+                if until and stamp >= until:
+                    return False
+            return True
+
+        def newest(group):
+            # Merge a word's (possibly several, for a prefix) posting lists newest first
+            return heapq.merge(*(reversed(ids) for ids in group), key=lambda i: -i)
+
+        order = sorted(range(len(groups)), key=lambda i: sum(len(ids) for ids in groups[i]))
+        groups = [groups[i] for i in order]
+        matchers = [matchers[i] for i in order]
+        matches = []
+        if len(groups) == len(terms):
+            rarest, others = groups[0], matchers[1:]
+            for entry_id in newest(rarest):
+                if all(has(entry_id) for has in others) and allowed(entry_id):
+                    matches.append(self.entries[entry_id])
+                    if len(matches) >= limit:
+                        return matches
+        if not partial:
+            return matches
+
+        # Partial matches: score the newest candidates of each word by how
+        # many words they contain
+        seen = {e["id"] for e in matches}
+        scored = []
+        for group in groups:
+            taken = 0
+            for entry_id in newest(group):
+                if taken >= limit * 4:
+                    break
+                if entry_id in seen or not allowed(entry_id):
+                    continue
+                seen.add(entry_id)
+                taken += 1
+                score = sum(1 for has in matchers if has(entry_id))
+                scored.append((score, entry_id))
+        scored.sort(reverse=True)
+        matches.extend(self.entries[entry_id] for _, entry_id in scored[:limit - len(matches)])
+        return matches
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class HistoryStore:
+    """Append-only command history in JSON Lines with rotation.
+
+    Entries are buffered and written in batches, either every
+    ``flush_every`` entries or every ``flush_interval`` seconds from a
+    background thread. The live file rolls over to ``.1``, ``.2``... once it
+    passes ``max_bytes`` or its first entry is older than ``max_age_days``;
+    at most ``backup_count`` old files are kept. Only the newest
+    ``max_entries`` are held in ``recent``; ``index`` covers everything
+    still on disk. With ``path=None`` nothing is written to disk.
+    """
+
+    def __init__(self, path="logs/command_history.jsonl", max_entries=100, max_bytes=1048576,
+                 backup_count=5, max_age_days=30, flush_every=20, flush_interval=2.0,
+                 max_indexed=100000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_age = timedelta(days=max_age_days) if max_age_days else None
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+
+        self.recent = deque(maxlen=max_entries or 100)
+        self.index = HistoryIndex(max_indexed)
+        self._pending = []
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._flusher = None
+        self._next_id = 1
+        self._file_started = None
+
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._load_tail()
+            if self.flush_interval:
+                self._flusher = threading.Thread(
+                    target=self._flush_loop, name="vocalshell-history", daemon=True
+                )
+                self._flusher.start()
+
+    @classmethod
+    def from_config(cls, config=None, preferences=None):
+        config = config or {}
+        preferences = preferences or {}
+        path = config.get("path", "logs/command_history.jsonl")
+        if not preferences.get("save_command_history", True):
+            path = None
+        return cls(
+            path=path,
+            max_entries=preferences.get("max_history_size", 100),
+            max_bytes=config.get("max_bytes", 1048576),
+            backup_count=config.get("backup_count", 5),
+            max_age_days=config.get("max_age_days", 30),
+            flush_every=config.get("flush_every", 20),
+            flush_interval=config.get("flush_interval", 2.0),
+            max_indexed=config.get("max_indexed", 100000),
+        )
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+    def append(self, entry):
+        now = datetime.now()
+        with self._lock:
+            record = dict(entry)
+            record.setdefault("timestamp", str(now))
+            record["id"] = self._next_id
+            self._next_id += 1
+            self.recent.append(record)
+            self.index.add(record)
+            if self.path:
+                self._pending.append(record)
+                if len(self._pending) >= self.flush_every:
+                    self.flush()
+        return record
+
+    def flush(self):
+        with self._lock:
+            if not self._pending or not self.path:
+                return
+            self._maybe_rotate()
+            data = "".join(json.dumps(r, default=str) + "\n" for r in self._pending)
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(data)
+            except OSError as e:
+                # Keep the entries and try again on the next flush
+                logger.error(f"Could not write command history to {self.path}: {e}")
+                return
+            if self._file_started is None:
+                self._file_started = parse_time(self._pending[0]["timestamp"])
+            self._pending.clear()
+
+    def close(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=self.flush_interval + 1)
+            self._flusher = None
+        self.flush()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _maybe_rotate(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        too_big = self.max_bytes and size >= self.max_bytes
+        too_old = (
+            self.max_age is not None and self._file_started is not None
+            and datetime.now() - self._file_started > self.max_age
+        )
+        if not (too_big or too_old):
+            return
+
+        if self.backup_count:
+            for i in range(self.backup_count - 1, 0, -1):
+                older = f"{self.path}.{i}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file_started = None
+
+    def _load_tail(self):
+        """Rebuild the index, id counter and recent entries from existing files."""
+        entries = []
+        for path in reversed(self._files()):
+            entries.extend(self._read(path))
+        for entry in entries:
+            self.index.add(entry)
+        self.recent.extend(entries[-self.recent.maxlen:])
+        if entries:
+            self._next_id = entries[-1].get("id", 0) + 1
+        current = self._read(self.path, limit=1)
+        if current:
+            self._file_started = parse_time(current[0].get("timestamp"))
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+    def _files(self):
+        """Current file first, then backups from newest to oldest."""
+        files = [self.path]
+        for i in range(1, self.backup_count + 1):
+            files.append(f"{self.path}.{i}")
+        return [f for f in files if os.path.exists(f)]
+
+    @staticmethod
+    def _read(path, limit=None):
+        entries = []
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        # A crash can leave a torn last line; skip it
+                        continue
+                    if limit and len(entries) >= limit:
+                        break
+        except OSError:
+            pass
+        return entries
+
+    def query(self, limit=50, since=None, before=None):
+        """Newest-first page of entries.
+
+        ``since`` drops entries at or before that time; ``before`` is an entry
+        id to continue paging from (only older entries are returned).
+        """
+        since = parse_time(since)
+
+        def wanted(entry):
+            if before is not None and entry.get("id", 0) >= before:
+                return False
+            if since is not None and parse_time(entry.get("timestamp")) <= since:
+                return False
+            return True
+
+        with self._lock:
+            memory = list(self.recent)
+        result = [e for e in reversed(memory) if wanted(e)][:limit]
+        oldest_in_memory = memory[0]["id"] if memory else None
+        if len(result) >= limit or not self.path or oldest_in_memory in (None, 1):
+            return result
+
+        # Older than what is held in memory: read the files newest first
+        self.flush()
+        cutoff = oldest_in_memory if before is None else min(before, oldest_in_memory)
+        for path in self._files():
+            for entry in reversed(self._read(path)):
+                if entry.get("id", 0) >= cutoff or not wanted(entry):
+                    continue
+                result.append(entry)
+                if len(result) >= limit:
+                    return result
+            if since is not None and path != self.path:
+                entries = self._read(path, limit=1)
+                if entries and parse_time(entries[0].get("timestamp")) <= since:
+                    break
+        return result
+
+    def nth_recent(self, n=1, session_id=None):
+        """``HistoryIndex.recent`` under the store lock."""
+        with self._lock:
+            return self.index.recent(n, session_id)
+
+    def search(self, query, limit=10, session_id=None, since=None, until=None, prefix=True, partial=True):
+        """``HistoryIndex.search`` under the store lock, so an append that
+        rebuilds the index can't run in the middle of it."""
+        with self._lock:
+            return self.index.search(query, limit, session_id, since, until, prefix, partial)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self.recent))
+
+    def __len__(self):
+        return len(self.recent)
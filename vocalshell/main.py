@@ -1,14 +1,20 @@
-=#!/usr/bin/env python3
+#!/usr/bin/env python3
+import os
+import re
+import time
 import logging
 import platform
 from vocalshell.speech_engine import SpeechRecognizer
 from vocalshell.nlp_parser import NLPCommandParser
 from vocalshell.command_executor import CommandExecutor
-from vocalshell.audio_utils import AudioPlayer, play_listen_sound, play_success_sound
+from vocalshell.script_builder import ScriptCompiler
+from vocalshell.history import HistoryStore
+from vocalshell.audio_utils import AudioPlayer, get_audio_player, play_listen_sound, play_success_sound
 from vocalshell.utils import load_config, setup_logging
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
+from rich.live import Live
 
 console = Console()
 
@@ -18,33 +24,53 @@ class VocalShell:
         self.logger = logging.getLogger(__name__)
         self.config = load_config(config_path)
 
+        voice_settings = load_config(self.config["system"].get("voice_settings", "config/voice_settings.json"))
         self.speech_recognizer = SpeechRecognizer(
             model_path=self.config["system"]["model_path"],
             use_online=not self.config["speech"].get("prefer_offline", True),
-            config=self.config.get("speech", {})
+            config=self.config.get("speech", {}),
+            voice_settings=voice_settings.get("speech_recognition")
         )
-        self.parser = NLPCommandParser(self.config["system"]["commands_config"])
+        # Load the offline model once here rather than on the first command
+        self.speech_recognizer.warmup()
+        # Decode the cue sounds and open the output stream before the first beep
+        get_audio_player()
+        self.history = HistoryStore.from_config(self.config.get("history"), voice_settings.get("preferences"))
+        self.parser = NLPCommandParser(
+            self.config["system"]["commands_config"],
+            normalize_steps=self.config.get("nlp", {}).get("normalize_steps"),
+            history=self.history
+        )
+        self.parser.watch(self.config["system"].get("config_reload_interval", 1.0))
         self.executor = CommandExecutor(self.config.get("executor", {}))
+        # Decode against the known commands and the current folder's files
+        self.speech_recognizer.use_command_grammar(self.parser, lambda: self.executor.session.cwd)
         self.is_windows = platform.system() == "Windows"
-        self.history = []
+        self.script_compiler = ScriptCompiler(self.is_windows)
+        self.script_dir = self.config["system"].get("script_dir", "scripts")
+        # Commands collected while recording a script, None when not recording
+        self.script = None
     def run(self):
         console.print(Panel(Text(" VocalShell - Say 'exit' to quit", style="bold green"), border_style="green"))
+        # Open the microphone and measure background noise once, up front
+        console.print("[cyan]Calibrating for background noise, please stay quiet...[/cyan]")
+        self.speech_recognizer.open()
         while True:
-            play_listen_sound()
-            text = self.speech_recognizer.listen()
+            text = self.listen()
             if not text:
                 console.print("[yellow]No speech detected[/yellow]")
                 continue
             console.print(f"[green]Heard:[/green] {text}")
             if text.lower() in ["exit", "quit", "stop"]:
                 break
+            if self.handle_script_command(text):
+                continue
             command, params, description, metadata = self.parser.parse_command(text)
             while command is None and "missing" in metadata:
                 missing_params = metadata["missing"]
                 for param in missing_params:
                     console.print(f"[yellow]Please provide value for '{param}':[/yellow]")
-                    play_listen_sound()
-                    value = self.speech_recognizer.listen()
+                    value = self.listen()
                     if not value:
                         console.print(f"[red]No input detected for '{param}', cancelling command.[/red]")
                         break
@@ -61,17 +87,102 @@ class VocalShell:
                     command = None
                     break
 
+            if command is None and "candidate" in metadata:
+                command, metadata = self.confirm_repeat(description, metadata["candidate"])
+            elif command is None and metadata.get("category") == "repeat":
+                console.print(f"[yellow]{description}[/yellow]")
             if command is None:
                 continue
-            success, output = self.executor.execute_command(command, metadata)
-            self.executor.display_result(command, success, output, metadata, use_tts=True)
+            if self.script is not None:
+                self.script.append(command)
+                console.print(f"[cyan]Added to script ({len(self.script)}):[/cyan] {command}")
+                continue
+            success, output = self.run_streaming(command, metadata)
+            self.executor.speak(output)
             play_success_sound()
             self.history.append({
                 "original": text,
                 "command": command,
                 "success": success,
-                "output": output
+                "output": output,
+                "metadata": metadata
             })
+        self.executor.tts.stop()
+        self.speech_recognizer.close()
+        self.history.close()
+
+    def listen(self):
+        """Play the listen cue, then record one phrase, leaving the cue out."""
+        self.speech_recognizer.ignore(play_listen_sound())
+        # Talking over the previous answer cuts it off; our own speech is not decoded
+        return self.speech_recognizer.listen(self.executor.stop_speaking, self.executor.is_speaking)
+
+    def confirm_repeat(self, description, candidate):
+        """Ask before running a history entry that only partly matched."""
+        console.print(f"[yellow]{description}[/yellow] {candidate['command']}")
+        console.print("[yellow]Say 'yes' to run it.[/yellow]")
+        answer = self.listen()
+        if (answer or "").lower().strip() not in ("yes", "yeah", "yes run it", "run it"):
+            console.print("[yellow]Not repeated.[/yellow]")
+            return None, {}
+        metadata = {k: v for k, v in candidate.items() if k not in ("command", "original")}
+        return candidate["command"], metadata
+
+    def handle_script_command(self, text):
+        """Handle 'start script', 'run script', 'save script as <name>' and
+        'cancel script'. Returns True if ``text`` was one of them."""
+        phrase = text.lower().strip()
+        if phrase in ("start script", "record script", "begin script"):
+            self.script = []
+            console.print("[cyan]Recording script: commands will be collected, not run[/cyan]")
+            return True
+        if self.script is None:
+            return False
+
+        if phrase in ("cancel script", "discard script"):
+            self.script = None
+            console.print("[yellow]Script discarded[/yellow]")
+            return True
+
+        if phrase in ("run script", "execute script"):
+            script = self.script_compiler.compile(self.script)
+            self.script = None
+            success, output = self.script_compiler.run(script, self.executor.session)
+            self.executor.display_result("Script", success, output, {})
+            self.executor.speak(output)
+            return True
+
+        match = re.match(r"save script(?: as (.+))?$", phrase)
+        if match:
+            name = match.group(1) or time.strftime("script_%Y%m%d_%H%M%S")
+            name = re.sub(r"[^\w.-]+", "_", name.strip())
+            path = self.script_compiler.write(
+                self.script_compiler.compile(self.script), os.path.join(self.script_dir, name)
+            )
+            self.script = None
+            console.print(f"[green]Saved script to {path}[/green]")
+            return True
+        return False
+
+    def run_streaming(self, command, metadata):
+        """Execute ``command``, redrawing its panel as each output line arrives."""
+        lines = []
+        success = False
+
+        def panel(style):
+            return Panel(Text("\n".join(lines[-200:]), style=style), title=command, border_style=style)
+
+        with Live(panel("yellow"), console=console, refresh_per_second=10) as live:
+            for stream, data in self.executor.stream_command(command, metadata):
+                if stream == "exit":
+                    success = data == 0
+                    continue
+                lines.append(data)
+                live.update(panel("yellow"))
+            output = "\n".join(lines) or ("Command executed successfully" if success else "Command failed")
+            lines[:] = output.splitlines()
+            live.update(panel("green" if success else "red"))
+        return success, output
 
 if __name__ == "__main__":
     shell = VocalShell()
@@ -0,0 +1,61 @@
+import os
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def _read_kb_fields(path, fields):
+    values = {}
+    with open(path) as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in fields:
+                values[fields[key]] = int(rest.split()[0]) * 1024
+    return values
+
+
+def process_memory(pid=None):
+    """Memory of one process in bytes.
+
+    On Linux ``pss`` (proportional set size) charges each shared page to
+    the processes sharing it, so summing ``pss`` over all workers gives
+    what the host actually needs; ``shared`` is the part of ``rss`` that
+    other processes map too (model pages inherited across fork, files in
+    the page cache). Elsewhere only the peak ``rss`` of this process is
+    known.
+    """
+    proc = f"/proc/{pid or 'self'}"
+    try:
+        values = _read_kb_fields(f"{proc}/smaps_rollup", {
+            "Rss": "rss", "Pss": "pss", "Shared_Clean": "shared_clean",
+            "Shared_Dirty": "shared_dirty", "Private_Clean": "private_clean",
+            "Private_Dirty": "private_dirty",
+        })
+        return {
+            "pid": pid or os.getpid(),
+            "rss": values["rss"],
+            "pss": values["pss"],
+            "shared": values["shared_clean"] + values["shared_dirty"],
+            "private": values["private_clean"] + values["private_dirty"],
+        }
+    except (OSError, KeyError):
+        pass
+    try:
+        values = _read_kb_fields(f"{proc}/status", {"VmRSS": "rss"})
+        return {"pid": pid or os.getpid(), "rss": values["rss"]}
+    except (OSError, KeyError):
+        pass
+    if pid is None and resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kB everywhere except macOS, which reports bytes
+        return {"pid": os.getpid(), "rss_peak": peak if sys.platform == "darwin" else peak * 1024}
+    return {"pid": pid or os.getpid()}
+
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.1f} {unit}" if unit != "B" else f"{n} B"
+        n /= 1024
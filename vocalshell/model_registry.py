@@ -0,0 +1,184 @@
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from vocalshell.memory import format_bytes, process_memory
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = "models/vosk-model-en-us-0.22"
+DEFAULT_SAMPLE_RATE = 16000
+# Seconds to wait for a free pooled recognizer before giving up
+DEFAULT_RECOGNIZER_TIMEOUT = 10.0
+
+
+class RecognizerPool:
+    """Bounded pool of reusable KaldiRecognizers for one model and sample rate.
+
+    At most ``max_size`` recognizers exist at once; callers beyond that wait
+    for one to be released instead of allocating fresh decoder state.
+    """
+
+    def __init__(self, registry, model_path, sample_rate=DEFAULT_SAMPLE_RATE, max_size=4):
+        self.registry = registry
+        self.model_path = model_path
+        self.sample_rate = sample_rate
+        self.max_size = max_size
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def acquire(self, timeout=None):
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("No speech recognizer available")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self.registry.create_recognizer(self.model_path, self.sample_rate)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, rec):
+        try:
+            rec.Reset()
+            self._idle.put(rec)
+        except Exception as e:
+            # A recognizer that can't be reset is dropped; a new one is built on demand
+            logger.warning(f"Discarding recognizer that failed to reset: {e}")
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def recognizer(self, timeout=None):
+        rec = self.acquire(timeout)
+        try:
+            yield rec
+        finally:
+            self.release(rec)
+
+
+def prefetch_model_files(model_path):
+    """Ask the kernel to read a model directory into the page cache.
+
+    Page cache is shared by every process, so workers that load the
+    model after this read it from memory instead of disk. Returns the
+    number of bytes covered.
+    """
+    total = 0
+    advise = getattr(os, "posix_fadvise", None)
+    for root, _, files in os.walk(model_path):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                size = os.path.getsize(path)
+                if advise is not None:
+                    fd = os.open(path, os.O_RDONLY)
+                    try:
+                        advise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                    finally:
+                        os.close(fd)
+                total += size
+            except OSError as e:
+                logger.debug(f"Could not prefetch {path}: {e}")
+    return total
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded Vosk models, keyed by model directory.
+
+    Models loaded before a fork are inherited by the child processes, which
+    share the pages copy-on-write (the decoder never writes to them), so a
+    model loaded in the parent costs its memory once rather than per worker.
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def get_model(self, model_path=None):
+        model_path = os.path.abspath(model_path or DEFAULT_MODEL_PATH)
+        model = self._models.get(model_path)
+        if model is not None:
+            return model
+
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            model = self._models.get(model_path)
+            if model is None:
+                from vosk import Model
+
+                if not os.path.isdir(model_path):
+                    raise FileNotFoundError(f"Vosk model not found: {model_path}")
+                logger.info(f"Loading Vosk model from {model_path}")
+                before = process_memory().get("rss", 0)
+                start = time.monotonic()
+                model = Model(model_path)
+                self._models[model_path] = model
+                after = process_memory().get("rss", 0)
+                logger.info(
+                    f"Loaded {os.path.basename(model_path)} in {time.monotonic() - start:.1f}s "
+                    f"(pid {os.getpid()}, RSS {format_bytes(after)}, +{format_bytes(after - before)})"
+                )
+        return model
+
+    def create_recognizer(self, model_path=None, sample_rate=DEFAULT_SAMPLE_RATE):
+        from vosk import KaldiRecognizer
+
+        return KaldiRecognizer(self.get_model(model_path), sample_rate)
+
+    def get_pool(self, model_path=None, sample_rate=DEFAULT_SAMPLE_RATE, max_size=4):
+        key = (os.path.abspath(model_path or DEFAULT_MODEL_PATH), sample_rate)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = RecognizerPool(self, key[0], sample_rate, max_size)
+                self._pools[key] = pool
+        return pool
+
+    def is_loaded(self, model_path=None):
+        return os.path.abspath(model_path or DEFAULT_MODEL_PATH) in self._models
+
+    def loaded_models(self):
+        return list(self._models)
+
+    def warmup(self, model_paths, prefetch=False):
+        """Load every given model now so the first utterance doesn't pay for it.
+
+        With ``prefetch`` the model files are first pulled into the page
+        cache, which helps when several processes load the same model.
+        """
+        loaded = []
+        for path in model_paths:
+            if not path:
+                continue
+            try:
+                if prefetch and not self.is_loaded(path):
+                    prefetch_model_files(os.path.abspath(path))
+                self.get_model(path)
+                loaded.append(path)
+            except Exception as e:
+                logger.error(f"Model warmup failed for {path}: {e}")
+        return loaded
+
+
+# -------------------------------------------------------------------------
+# SAFE GLOBAL INSTANCE
+# -------------------------------------------------------------------------
+_model_registry = None
+
+
+def get_model_registry():
+    global _model_registry
+    if _model_registry is None:
+        _model_registry = ModelRegistry()
+    return _model_registry
+
+
+def warmup_models(*model_paths):
+    return get_model_registry().warmup(model_paths or [DEFAULT_MODEL_PATH])
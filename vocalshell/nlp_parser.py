@@ -1,29 +1,58 @@
 import re
+import copy
 import json
 import platform
 import logging
-import difflib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
 
+from vocalshell.grammar import CompiledGrammar
+from vocalshell.config_watcher import ConfigWatcher
+from vocalshell.normalizer import TextNormalizer, number_words
 
 logger = logging.getLogger(__name__)
 
+# "repeat", "run that again", "repeat the last command"
+_REPEAT_LAST = re.compile(
+    r"(?:repeat|rerun|redo)(?: (?:the|that|it))?(?: last)?(?: command)?(?: again)?"
+    r"|(?:run|do) (?:that|it|the last command) again|again|same again"
+)
+# "repeat 3", "repeat command number three", "rerun 2 commands ago"
+_REPEAT_NTH = re.compile(r"(?:repeat|rerun|redo) (?:command )?(?:number )?([\w ]+?)(?: commands? ago)?")
+# "do what i did yesterday with the logs folder", "rerun the ping (command)".
+# Only these explicit forms search; anything else starting with "repeat"
+# is left to the command grammar, and never run as a shell command.
+_REPEAT_SEARCH = re.compile(
+    r"(?:(?:do|repeat|redo) what i (?:did|ran)(?: (yesterday|today|earlier))?"
+    r"(?: (?:with|on|in|for|to))?(?: the)? (.+?)"
+    r"|(?:repeat|rerun|redo) the (.+?)(?: command)?(?: from (yesterday|today|earlier))?)(?: again)?"
+)
+_REPEAT_VERB = re.compile(r"(?:repeat|rerun|redo)\b ?(.*)")
+_REPEAT_STOPWORDS = {"the", "a", "an", "that", "it", "my", "one", "again"}
+
 class NLPCommandParser:
-    def __init__(self, config_path='config/system_config.json'):
+    def __init__(self, config_path='config/system_config.json', cache_size=256, normalize_steps=None, history=None):
         self.is_windows = platform.system() == "Windows"
+        self.config_path = config_path
+        # HistoryStore used to answer "repeat last" style commands
+        self.history = history
+        self._watcher = None
         self.command_mappings = self._load_command_mappings(config_path)
+        self.grammar = CompiledGrammar(self.command_mappings)
 
-        self.filler_words = [
-            "please", "can you", "could you", "would you", "will you",
-            "i want to", "i would like to", "kindly", "just"
-        ]
-    def _normalize_input(self, text: str) -> str:
-        text = text.lower().strip()
-        for filler in self.filler_words:
-            text = text.replace(filler, "")
-    # Strip common file extensions so user can say Apple.txt or Apple
-        text = re.sub(r'\.(txt|csv|log|py|md)$', '', text)
-        return text.strip()
+        # Normalized utterance -> parse result, most recently used last
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
 
+        self.normalizer = TextNormalizer(normalize_steps)
+        self.filler_words = self.normalizer.filler_words
+
+    def _normalize_input(self, text: str) -> str:
+        return self.normalizer(text)
 
     def _load_command_mappings(self, config_path=None):
         if config_path:
@@ -32,24 +61,7 @@ class NLPCommandParser:
                 return data.get("command_mappings", {})
         return {}
 
-    def _normalize_input(self, text: str) -> str:
-        text = text.lower().strip()
-        for filler in self.filler_words:
-            text = text.replace(filler, "")
-        return text.strip()
-
-    def _fuzzy_match(self, input_text: str, patterns: list[str], threshold: float = 0.7):
-        for pat in patterns:
-            if re.search(pat, input_text):
-                return pat
-
-            ratio = difflib.SequenceMatcher(None, input_text, pat).ratio()
-            if ratio >= threshold:
-                return pat
-        return None
-
-    def _extract_parameters(self, pattern: str, text: str, command_template: str):
-        match = re.search(pattern, text)
+    def _extract_parameters(self, match, command_template: str):
         if not match:
             return {}
 
@@ -66,44 +78,207 @@ class NLPCommandParser:
 
         return params
 
-    def parse_command(self, text: str):
-        original_text = text
+    def reload(self):
+        """Rebuild the grammar from the config file and swap it in.
+
+        The new grammar is built before the lock is taken, so parses in
+        flight keep using the old one and never see a partial build. A
+        config that fails to load leaves the current grammar in place.
+        """
+        try:
+            command_mappings = self._load_command_mappings(self.config_path)
+            grammar = CompiledGrammar(command_mappings)
+        except (OSError, ValueError) as e:
+            logger.error(f"Keeping previous command mappings, could not load {self.config_path}: {e}")
+            return False
+        with self._cache_lock:
+            self.command_mappings = command_mappings
+            self.grammar = grammar
+            self._cache.clear()
+        logger.info(f"Loaded {len(grammar)} command patterns from {self.config_path}")
+        return True
+
+    def watch(self, interval=1.0):
+        """Reload in the background whenever the config file changes."""
+        if self._watcher is None and self.config_path:
+            self._watcher = ConfigWatcher(self.config_path, self.reload, interval).start()
+        return self._watcher
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+    def cache_stats(self):
+        with self._cache_lock:
+            lookups = self._cache_hits + self._cache_misses
+            return {
+                "hits": self._cache_hits,
+                "misses": self._cache_misses,
+                "size": len(self._cache),
+                "max_size": self.cache_size,
+                "hit_rate": self._cache_hits / lookups if lookups else 0.0
+            }
+
+    def _resolve_repeat(self, text, session_id=None):
+        """Look up "repeat ..." commands in the history index.
+
+        Returns a parse result for the stored command, or None if ``text``
+        is not a repeat command at all. A search that only partly matches
+        returns no command; the closest entry is put in
+        ``metadata["candidate"]`` for the user to confirm.
+        """
+        history = self.history
+        nth = _REPEAT_NTH.fullmatch(text)
+        position = number_words(nth.group(1)) if nth else ""
+        search = _REPEAT_SEARCH.fullmatch(text)
+
+        entry = None
+        if _REPEAT_LAST.fullmatch(text):
+            entry = history.nth_recent(1, session_id)
+        elif position.isdigit():
+            entry = history.nth_recent(int(position), session_id)
+        elif search:
+            day = search.group(1) or search.group(4)
+            terms = search.group(2) or search.group(3)
+            since = until = None
+            if day in ("today", "yesterday"):
+                midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+                since = midnight - timedelta(days=1) if day == "yesterday" else midnight
+                until = midnight if day == "yesterday" else None
+            query = " ".join(w for w in terms.split() if w not in _REPEAT_STOPWORDS)
+            if not query:
+                return None
+            # Only run an entry containing every word that was said; the
+            # closest partial match is offered for confirmation instead
+            found = history.search(query, 1, session_id, since, until, prefix=False, partial=False)
+            if not found:
+                closest = history.search(query, 1, session_id, since, until, prefix=False)
+                if closest:
+                    return self._repeat_candidate(closest[0])
+            entry = found[0] if found else None
+        else:
+            return None
+
+        if entry is None:
+            return None, {}, "Nothing in history to repeat", {"category": "repeat", "dangerous": False}
+        return entry["command"], {}, f"Repeat: {entry.get('original')}", self._repeat_metadata(entry)
+
+    def _unmatched_repeat(self, text, session_id=None):
+        """Answer a "repeat ..." the command grammar didn't know either.
+
+        It is never run as typed: the closest history entry, if any, is
+        offered for confirmation instead.
+        """
+        words = _REPEAT_VERB.fullmatch(text).group(1).split()
+        query = " ".join(w for w in words if w not in _REPEAT_STOPWORDS)
+        closest = self.history.search(query, 1, session_id, prefix=False) if query else []
+        if closest:
+            return self._repeat_candidate(closest[0])
+        return None, {}, "Nothing in history matches", {"category": "repeat", "dangerous": False}
+
+    def _repeat_candidate(self, entry):
+        return None, {}, f"No exact match in history. Did you mean: {entry.get('original')}?", {
+            "category": "repeat",
+            "dangerous": False,
+            "candidate": dict(
+                self._repeat_metadata(entry),
+                command=entry["command"],
+                original=entry.get("original")
+            )
+        }
+
+    @staticmethod
+    def _repeat_metadata(entry):
+        metadata = dict(entry.get("metadata") or {})
+        return {
+            "category": "repeat",
+            "dangerous": metadata.get("dangerous", True),
+            "description": metadata.get("description", ""),
+            "repeat_of": entry["id"]
+        }
+
+    def parse_command(self, text: str, session_id=None):
         text = self._normalize_input(text)
+        # Repeats come straight from history, never from the grammar or cache
+        if self.history is not None:
+            repeated = self._resolve_repeat(text, session_id)
+            if repeated is not None:
+                return repeated
+
+        key = (text, self.is_windows)
+
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                self._cache_hits += 1
+            else:
+                self._cache_misses += 1
+                grammar = self.grammar
+        if result is None:
+            result = self._parse(text, grammar)
+            if self.cache_size:
+                with self._cache_lock:
+                    # Skip if a reload swapped the grammar while we parsed
+                    if grammar is self.grammar:
+                        self._cache[key] = result
+                        while len(self._cache) > self.cache_size:
+                            self._cache.popitem(last=False)
+
+        if self.history is not None and result[3]["category"] == "direct" and _REPEAT_VERB.fullmatch(text):
+            return self._unmatched_repeat(text, session_id)
+
+        # Callers fill in missing params in place; never hand out the cached dicts
+        return copy.deepcopy(result)
 
-        for category, mapping in self.command_mappings.items():
-            patterns = mapping.get("patterns", [])
-            matched_pattern = self._fuzzy_match(text, patterns)
-
-            if matched_pattern:
-                command_template = (
-                    mapping["windows_command"] if self.is_windows
-                    else mapping.get("linux_command", mapping["windows_command"])
-                )
-
-                params = self._extract_parameters(matched_pattern, text, command_template)
-                required_placeholders = re.findall(r"\{(\w+)\}", command_template)
-
-                missing = [ph for ph in required_placeholders if ph not in params or not params[ph]]
-                if missing:
-                    return None, params, f"Missing parameters: {', '.join(missing)}", {
-                        "category": category,
-                        "dangerous": mapping.get("dangerous", False),
-                        "description": mapping.get("description", ""),
-                        "missing": missing
-                    }
-
-                try:
-                    command = command_template.format(**params)
-                except KeyError:
-                    command = command_template
-
-                metadata = {
+    def parse_many(self, texts, session_id=None):
+        """Parse a list of utterances, parsing each distinct one only once."""
+        parsed = {}
+        results = []
+        for text in texts:
+            key = self._normalize_input(text)
+            if key not in parsed:
+                parsed[key] = self.parse_command(text, session_id)
+                results.append(parsed[key])
+            else:
+                results.append(copy.deepcopy(parsed[key]))
+        return results
+
+    def _parse(self, text, grammar):
+        best = grammar.match(text)
+        if best is not None:
+            category, mapping = best.rule.category, best.rule.mapping
+
+            command_template = (
+                mapping["windows_command"] if self.is_windows
+                else mapping.get("linux_command", mapping["windows_command"])
+            )
+
+            params = self._extract_parameters(best.match, command_template)
+            required_placeholders = re.findall(r"\{(\w+)\}", command_template)
+
+            missing = [ph for ph in required_placeholders if ph not in params or not params[ph]]
+            if missing:
+                return None, params, f"Missing parameters: {', '.join(missing)}", {
                     "category": category,
-                    "dangerous": mapping.get("dangerous", True),
-                    "description": mapping.get("description", "")
+                    "dangerous": mapping.get("dangerous", False),
+                    "description": mapping.get("description", ""),
+                    "missing": missing
                 }
 
-                return command, params, mapping.get("description", ""), metadata
+            try:
+                command = command_template.format(**params)
+            except KeyError:
+                command = command_template
+
+            metadata = {
+                "category": category,
+                "dangerous": mapping.get("dangerous", True),
+                "description": mapping.get("description", "")
+            }
+
+            return command, params, mapping.get("description", ""), metadata
         return text, {}, "Direct execution", {"category": "direct", "dangerous": True}
 
 
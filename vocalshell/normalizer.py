@@ -0,0 +1,139 @@
+import re
+
+DEFAULT_FILLER_WORDS = [
+    "please", "can you", "could you", "would you", "will you",
+    "i want to", "i would like to", "kindly", "just"
+]
+
+# Strip common file extensions so user can say Apple.txt or Apple
+_EXTENSION = re.compile(r"\.(txt|csv|log|py|md)$")
+# Recognisers may end a sentence with a mark ("list files."). Only one
+# trailing mark is dropped, never after "." or "/", so "cd .." and "cd ./"
+# survive; marks inside the text may be shell syntax ("echo hi; echo there").
+_SENTENCE_PUNCTUATION = re.compile(r"(?<![./])[.,!?]$")
+
+_UNITS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11,
+    "twelve": 12, "thirteen": 13, "fourteen": 14, "fifteen": 15, "sixteen": 16,
+    "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+_TENS = {
+    "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50,
+    "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+}
+_SCALES = {"hundred": 100, "thousand": 1000, "million": 1000000}
+_NUMBER_WORD = "(?:%s)" % "|".join(list(_UNITS) + list(_TENS) + list(_SCALES))
+# "and" only counts inside a number: "one hundred and five", not "one and two"
+_NUMBER_RUN = re.compile(
+    r"\b{0}(?:\s+{0}|(?:(?<=hundred)|(?<=thousand)|(?<=million))\s+and(?=\s+{0}\b))*\b".format(_NUMBER_WORD)
+)
+
+
+def filler_patterns(filler_words):
+    """One ``(longest word, pattern)`` per filler phrase, longest phrase first.
+
+    Each pattern starts with the phrase's literal first word, so ``re`` can
+    find candidates with its fast substring search; the leading word
+    boundary is checked by a lookbehind placed after that word. A single
+    alternation led by ``\\b`` is tried at every position of the text and
+    is several times slower on long dictation.
+    """
+    phrases = sorted({w.strip().lower() for w in filler_words if w.strip()}, key=lambda p: (-len(p), p))
+    patterns = []
+    for phrase in phrases:
+        words = phrase.split()
+        first, *rest = [re.escape(w) for w in words]
+        # Whitespace is left as typed (it may be inside a quoted argument),
+        # so the words of a phrase may be separated by any run of it
+        source = rf"{first}(?<!\w{first})" + "".join(rf"\s+{w}" for w in rest)
+        patterns.append((max(words, key=len), re.compile(rf"{source}\b[ \t]?")))
+    return patterns
+
+
+def _spoken_number(words):
+    """'twenty five' -> '25', 'eight zero eight zero' -> '8080'."""
+    words = [w for w in words if w != "and"]
+    if len(words) > 1 and all(w in _UNITS and _UNITS[w] < 10 for w in words):
+        return "".join(str(_UNITS[w]) for w in words)
+
+    total = current = 0
+    for word in words:
+        if word in _UNITS:
+            current += _UNITS[word]
+        elif word in _TENS:
+            current += _TENS[word]
+        elif word == "hundred":
+            current = (current or 1) * 100
+        else:
+            total += (current or 1) * _SCALES[word]
+            current = 0
+    return str(total + current)
+
+
+# -------------------------------------------------------------------------
+# STEPS
+# -------------------------------------------------------------------------
+def lowercase(text):
+    return text.lower()
+
+
+def strip_punctuation(text):
+    return _SENTENCE_PUNCTUATION.sub("", text.rstrip())
+
+
+def number_words(text):
+    return _NUMBER_RUN.sub(lambda m: _spoken_number(m.group(0).split()), text)
+
+
+def strip_extension(text):
+    return _EXTENSION.sub("", text.rstrip())
+
+
+STEPS = {
+    "lowercase": lowercase,
+    "punctuation": strip_punctuation,
+    "fillers": None,  # bound per normalizer to its own filler list
+    "numbers": number_words,
+    "extension": strip_extension,
+}
+
+# "punctuation" is opt-in since text typed at /process-text is shell input;
+# list it after "fillers" so "desktop, please" loses the comma too
+DEFAULT_STEPS = ["lowercase", "fillers", "extension"]
+
+
+class TextNormalizer:
+    """Runs an utterance through a fixed list of cleanup steps.
+
+    ``steps`` are names from ``STEPS`` or plain ``str -> str`` callables.
+    Filler phrases are removed one precompiled, word-bounded pattern at a
+    time, longest first, so "just" no longer eats the start of "justify".
+    """
+
+    def __init__(self, steps=None, filler_words=None):
+        self.filler_words = list(DEFAULT_FILLER_WORDS if filler_words is None else filler_words)
+        self._fillers = filler_patterns(self.filler_words)
+        self.steps = []
+        for step in steps or DEFAULT_STEPS:
+            if callable(step):
+                self.steps.append(step)
+            elif step == "fillers":
+                self.steps.append(self.strip_fillers)
+            elif step in STEPS:
+                self.steps.append(STEPS[step])
+            else:
+                raise ValueError(f"Unknown normalization step: {step}")
+
+    def strip_fillers(self, text):
+        for word, pattern in self._fillers:
+            # A plain substring test is far cheaper than a regex pass
+            if word in text:
+                text = pattern.sub("", text)
+        return text
+
+    def __call__(self, text):
+        text = text.strip()
+        for step in self.steps:
+            text = step(text)
+        return text.strip()
@@ -0,0 +1,269 @@
+import os
+import shutil
+import hashlib
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_URL = "https://alphacephei.com/vosk/models/vosk-model-en-us-0.22.zip"
+# Written into a model directory once it has been completely extracted
+READY_MARKER = ".provisioned"
+# Present in a model directory while extraction is under way
+EXTRACTING_MARKER = ".extracting"
+
+
+class ProvisioningError(Exception):
+    """Raised when a model can't be downloaded, verified or extracted."""
+
+
+def model_name(url):
+    return os.path.basename(url.split("?", 1)[0]).rsplit(".zip", 1)[0]
+
+
+def is_model_dir(path):
+    """True for a completely provisioned model, or one unpacked by hand.
+
+    An unmarked directory only counts if nothing suggests an extraction
+    stopped half way: no extraction marker, no ``.tmp`` member and no zip
+    or ``.part`` download left beside it.
+    """
+    if os.path.exists(os.path.join(path, READY_MARKER)):
+        return True
+    if os.path.exists(os.path.join(path, EXTRACTING_MARKER)):
+        return False
+    # Vosk models always ship conf/model.conf; older installs have no marker
+    if not os.path.exists(os.path.join(path, "conf", "model.conf")):
+        return False
+    archive = os.path.normpath(path) + ".zip"
+    if os.path.exists(archive) or os.path.exists(archive + ".part"):
+        return False
+    for _, _, files in os.walk(path):
+        if any(name.endswith(".tmp") for name in files):
+            return False
+    return True
+
+
+class ModelProvisioner:
+    """Downloads and unpacks a Vosk model zip into ``models_dir``.
+
+    The download goes to ``<name>.zip.part`` and is resumed with an HTTP
+    ``Range`` request after a failure, hashing as it goes (the existing
+    part is hashed first), so a dropped connection on a 1.8 GB file costs
+    only what was not yet received. With ``mirror_dir`` the zip is taken
+    from that directory when present instead of from the network.
+    Extraction streams one member at a time and skips files already on
+    disk with the right size.
+    """
+
+    def __init__(self, models_dir="models", mirror_dir=None, chunk_size=1 << 20, timeout=30,
+                 retries=5, keep_archive=False):
+        self.models_dir = models_dir
+        self.mirror_dir = mirror_dir
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.retries = retries
+        self.keep_archive = keep_archive
+        self.status = {"state": "idle", "received": 0, "total": None, "error": None, "path": None}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config=None):
+        config = config or {}
+        return cls(
+            models_dir=config.get("dir", "models"),
+            mirror_dir=config.get("mirror_dir"),
+            timeout=config.get("timeout", 30),
+            retries=config.get("retries", 5),
+        )
+
+    def _update(self, **values):
+        with self._lock:
+            self.status.update(values)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.status)
+
+    # ------------------------------------------------------------------
+    # Download
+    # ------------------------------------------------------------------
+    def _hash_existing(self, path, hasher):
+        size = 0
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(self.chunk_size), b""):
+                hasher.update(block)
+                size += len(block)
+        return size
+
+    def _fetch(self, url, part, hasher):
+        """One attempt: resume ``part`` from where it stops. Returns the hasher."""
+        have = self._hash_existing(part, hasher) if os.path.exists(part) else 0
+        request = urllib.request.Request(url)
+        if have:
+            request.add_header("Range", f"bytes={have}-")
+        try:
+            response = urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and have:
+                # Range not satisfiable: the part file already holds everything
+                return hasher
+            raise
+
+        with response:
+            if have and response.status != 206:
+                # Server ignored the range; start over
+                logger.info(f"{url} does not support resume, downloading from the start")
+                hasher = hashlib.sha256()
+                have = 0
+            length = response.headers.get("Content-Length")
+            total = have + int(length) if length is not None else None
+            self._update(received=have, total=total)
+            with open(part, "ab" if have else "wb") as f:
+                for block in iter(lambda: response.read(self.chunk_size), b""):
+                    f.write(block)
+                    hasher.update(block)
+                    have += len(block)
+                    self._update(received=have)
+        if total is not None and have < total:
+            raise ProvisioningError(f"Connection closed after {have} of {total} bytes")
+        return hasher
+
+    def download(self, url, dest, sha256=None):
+        """Download ``url`` to ``dest``, resuming and verifying ``sha256``."""
+        part = dest + ".part"
+        for attempt in range(1, self.retries + 1):
+            try:
+                hasher = self._fetch(url, part, hashlib.sha256())
+                break
+            except (OSError, ProvisioningError) as e:
+                if attempt == self.retries:
+                    raise ProvisioningError(f"Download of {url} failed: {e}") from e
+                logger.warning(f"Download interrupted ({e}), resuming (attempt {attempt + 1})")
+                time.sleep(min(2 ** attempt, 30))
+
+        digest = hasher.hexdigest()
+        if sha256 and digest.lower() != sha256.lower():
+            os.remove(part)
+            raise ProvisioningError(f"Checksum mismatch for {url}: got {digest}, expected {sha256}")
+        os.replace(part, dest)
+        return digest
+
+    def verify(self, path, sha256):
+        hasher = hashlib.sha256()
+        self._hash_existing(path, hasher)
+        if hasher.hexdigest().lower() != sha256.lower():
+            raise ProvisioningError(f"Checksum mismatch for {path}")
+
+    # ------------------------------------------------------------------
+    # Extract
+    # ------------------------------------------------------------------
+    def extract(self, archive, dest_root):
+        """Unpack ``archive`` under ``dest_root`` one member at a time."""
+        root = os.path.abspath(dest_root)
+        extracted = skipped = 0
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                target = os.path.abspath(os.path.join(root, info.filename))
+                if os.path.commonpath([root, target]) != root:
+                    raise ProvisioningError(f"Unsafe path in archive: {info.filename}")
+                if info.is_dir():
+                    os.makedirs(target, exist_ok=True)
+                    continue
+                if os.path.exists(target) and os.path.getsize(target) == info.file_size:
+                    skipped += 1
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                # Written beside the target and renamed, so a crash never
+                # leaves a truncated file with a plausible name
+                with zf.open(info) as src, open(target + ".tmp", "wb") as dst:
+                    shutil.copyfileobj(src, dst, self.chunk_size)
+                os.replace(target + ".tmp", target)
+                extracted += 1
+        logger.info(f"Extracted {extracted} files from {archive} ({skipped} already present)")
+        return extracted, skipped
+
+    # ------------------------------------------------------------------
+    # Whole model
+    # ------------------------------------------------------------------
+    def provision(self, url=DEFAULT_MODEL_URL, sha256=None):
+        """Make sure the model from ``url`` is unpacked; returns its directory."""
+        name = model_name(url)
+        path = os.path.join(self.models_dir, name)
+        archive_name = os.path.basename(url.split("?", 1)[0])
+        # A zip or .part left beside the directory means an earlier run
+        # stopped half way, even if the directory looks like a model
+        leftover = os.path.join(self.models_dir, archive_name)
+        if is_model_dir(path):
+            self._update(state="ready", path=path)
+            return path
+
+        os.makedirs(self.models_dir, exist_ok=True)
+        mirrored = os.path.join(self.mirror_dir, archive_name) if self.mirror_dir else None
+        try:
+            if mirrored and os.path.exists(mirrored):
+                logger.info(f"Using {mirrored} from the local mirror")
+                archive = mirrored
+                if sha256:
+                    self._update(state="verifying")
+                    self.verify(archive, sha256)
+            else:
+                archive = os.path.join(self.models_dir, archive_name)
+                if os.path.exists(archive) and sha256:
+                    # Left behind by an earlier run that stopped while extracting
+                    self._update(state="verifying")
+                    try:
+                        self.verify(archive, sha256)
+                    except ProvisioningError:
+                        os.remove(archive)
+                if not os.path.exists(archive):
+                    self._update(state="downloading")
+                    self.download(url, archive, sha256)
+
+            self._update(state="extracting")
+            # Marks the directory unusable until the ready marker is written
+            os.makedirs(path, exist_ok=True)
+            open(os.path.join(path, EXTRACTING_MARKER), "w").close()
+            self.extract(archive, self.models_dir)
+            if os.listdir(path) == [EXTRACTING_MARKER]:
+                raise ProvisioningError(f"{archive_name} did not contain {name}/")
+            with open(os.path.join(path, READY_MARKER), "w") as f:
+                f.write(url + "\n")
+            os.remove(os.path.join(path, EXTRACTING_MARKER))
+            if not self.keep_archive:
+                for stale in (leftover, leftover + ".part"):
+                    if os.path.exists(stale):
+                        os.remove(stale)
+        except Exception as e:
+            self._update(state="failed", error=str(e))
+            raise
+        self._update(state="ready", path=path, error=None)
+        return path
+
+    def start(self, url=DEFAULT_MODEL_URL, sha256=None, on_ready=None):
+        """Provision on a daemon thread; ``on_ready(path)`` runs when done."""
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+
+        def run():
+            try:
+                path = self.provision(url, sha256)
+            except Exception as e:
+                logger.error(f"Model provisioning failed: {e}")
+                return
+            if on_ready is not None:
+                on_ready(path)
+
+        self._update(state="pending")
+        self._thread = threading.Thread(target=run, name="vocalshell-provision", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    @property
+    def ready(self):
+        return self.snapshot()["state"] == "ready"
@@ -0,0 +1,497 @@
+import json
+import time
+import logging
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from vocalshell.model_registry import DEFAULT_RECOGNIZER_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+Transcript = namedtuple("Transcript", ["text", "confidence", "backend", "latency"])
+
+EMPTY = Transcript("", 0.0, None, 0.0)
+
+
+# -------------------------------------------------------------------------
+# BACKENDS
+# -------------------------------------------------------------------------
+class BufferedDecoder:
+    """Collects 16 kHz 16-bit mono frames and transcribes them in one go."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.audio = bytearray()
+
+    def feed(self, frame):
+        self.audio += frame
+
+    def finish(self):
+        return self.backend.transcribe(bytes(self.audio))
+
+    def close(self):
+        pass
+
+
+class RecognizerBackend:
+    """One speech-to-text engine.
+
+    Subclasses implement ``transcribe(pcm)`` returning ``(text, confidence)``
+    for 16 kHz 16-bit mono audio. Engines that can decode while audio is
+    still arriving also override ``decoder()``.
+    """
+
+    name = "backend"
+    timeout = None
+
+    def decoder(self):
+        return BufferedDecoder(self)
+
+    def transcribe(self, pcm):
+        raise NotImplementedError
+
+
+class VoskDecoder:
+    def __init__(self, pool, timeout=None):
+        self.pool = pool
+        self.rec = pool.acquire(timeout)
+        self.rec.SetWords(True)
+        self.segments = []
+
+    def feed(self, frame):
+        if self.rec.AcceptWaveform(frame):
+            self.segments.append(json.loads(self.rec.Result()))
+
+    def finish(self):
+        self.segments.append(json.loads(self.rec.FinalResult()))
+        self.close()
+        # A grammar recognizer reports out-of-grammar speech as [unk]
+        words = [w for s in self.segments for w in s.get("result", []) if w.get("word") != "[unk]"]
+        if words:
+            text = " ".join(w["word"] for w in words)
+        else:
+            text = " ".join(s.get("text", "") for s in self.segments if s.get("text")).replace("[unk]", "")
+        text = " ".join(text.split())
+        confidences = [w.get("conf", 1.0) for w in words]
+        return text, (sum(confidences) / len(confidences) if confidences else 0.0)
+
+    def close(self):
+        if self.rec is not None:
+            self.pool.release(self.rec)
+            self.rec = None
+
+
+class GrammarPool:
+    """A single Vosk recognizer restricted to a ``DecodingGrammar``.
+
+    Quacks like ``RecognizerPool`` for ``VoskDecoder``. The recognizer is
+    rebuilt whenever the grammar's version changes; with a model that has
+    no runtime graph support (the large en-us models) Vosk ignores the
+    grammar, hence the optional separate ``model_path``.
+    """
+
+    def __init__(self, registry, model_path, grammar, sample_rate=16000):
+        self.registry = registry
+        self.model_path = model_path
+        self.grammar = grammar
+        self.sample_rate = sample_rate
+        self._rec = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        if not self._lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise TimeoutError("Grammar recognizer busy")
+        try:
+            version, phrases = self.grammar.current()
+            if self._rec is None or version != self._version:
+                from vosk import KaldiRecognizer
+
+                model = self.registry.get_model(self.model_path)
+                self._rec = KaldiRecognizer(model, self.sample_rate, phrases)
+                self._version = version
+            return self._rec
+        except Exception:
+            self._lock.release()
+            raise
+
+    def release(self, rec):
+        try:
+            rec.Reset()
+        except Exception as e:
+            logger.warning(f"Discarding grammar recognizer that failed to reset: {e}")
+            self._rec = None
+        finally:
+            self._lock.release()
+
+
+class VoskBackend(RecognizerBackend):
+    """Offline decoding with a pooled Vosk recognizer, fed frame by frame.
+
+    After ``use_grammar()`` utterances are decoded against the command
+    phrase list instead of the full vocabulary.
+    """
+
+    name = "vosk"
+
+    def __init__(self, pool, timeout=None, acquire_timeout=None):
+        self.pool = pool
+        self.timeout = timeout
+        self.acquire_timeout = acquire_timeout
+        self.grammar_pool = None
+
+    def use_grammar(self, grammar, model_path=None):
+        self.grammar_pool = GrammarPool(
+            self.pool.registry, model_path or self.pool.model_path, grammar, self.pool.sample_rate
+        )
+
+    def decoder(self):
+        return VoskDecoder(self.grammar_pool or self.pool, self.acquire_timeout)
+
+    def transcribe(self, pcm):
+        decoder = self.decoder()
+        try:
+            decoder.feed(pcm)
+            return decoder.finish()
+        finally:
+            decoder.close()
+
+
+class GoogleBackend(RecognizerBackend):
+    """Google Web Speech through ``speech_recognition``; needs the network."""
+
+    name = "google"
+
+    def __init__(self, recognizer, language="en-US", timeout=5.0):
+        self.recognizer = recognizer
+        self.language = language
+        self.timeout = timeout
+        self.recognizer.operation_timeout = timeout
+
+    def transcribe(self, pcm):
+        import speech_recognition as sr
+
+        audio = sr.AudioData(pcm, 16000, 2)
+        try:
+            response = self.recognizer.recognize_google(audio, language=self.language, show_all=True)
+        except sr.UnknownValueError:
+            return "", 0.0
+        alternatives = response.get("alternative") if isinstance(response, dict) else None
+        if not alternatives:
+            return "", 0.0
+        best = alternatives[0]
+        # Google only scores the top alternative, and not always
+        return best.get("transcript", ""), best.get("confidence", 1.0)
+
+
+class StubBackend(RecognizerBackend):
+    """Returns canned text, for tests and for running without a microphone
+    model or network. ``text`` may be a callable taking the PCM bytes."""
+
+    name = "stub"
+
+    def __init__(self, text="", confidence=1.0, delay=0.0, error=None, name=None):
+        self.text = text
+        self.confidence = confidence
+        self.delay = delay
+        self.error = error
+        if name:
+            self.name = name
+
+    def transcribe(self, pcm):
+        if self.delay:
+            time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        text = self.text(pcm) if callable(self.text) else self.text
+        return text, self.confidence
+
+
+# -------------------------------------------------------------------------
+# HEALTH
+# -------------------------------------------------------------------------
+class CircuitBreaker:
+    """Stops calling a backend after ``failures`` errors in a row.
+
+    After ``reset_after`` seconds one trial call is let through; success
+    closes the breaker again, failure re-opens it.
+    """
+
+    def __init__(self, failures=3, reset_after=30.0):
+        self.max_failures = failures
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open":
+                return False
+            if self.opened_at is not None:
+                # Half open: one trial at a time
+                self.opened_at = time.monotonic()
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.max_failures:
+                self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Latencies of the last ``window`` calls to one backend."""
+
+    def __init__(self, window=50):
+        self.samples = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+
+    def record(self, seconds, ok=True):
+        self.calls += 1
+        if ok:
+            self.samples.append(seconds)
+        else:
+            self.errors += 1
+
+    def percentile(self, p):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+        }
+
+
+# -------------------------------------------------------------------------
+# ROUTING
+# -------------------------------------------------------------------------
+class RecognizerRouter:
+    """Sends each utterance to one or more backends.
+
+    ``mode="fallback"`` tries backends in order, moving on when one fails,
+    times out or is not confident. ``mode="race"`` decodes with every
+    healthy backend at once and returns the first answer with at least
+    ``min_confidence``. Each backend has its own ``CircuitBreaker`` and
+    ``LatencyTracker``; a backend whose breaker is open is skipped.
+    """
+
+    def __init__(self, backends, mode="fallback", min_confidence=0.5, breaker_failures=3,
+                 breaker_reset=30.0):
+        if mode not in ("fallback", "race"):
+            raise ValueError(f"Unknown recognizer mode: {mode}")
+        self.backends = list(backends)
+        self.mode = mode
+        self.min_confidence = min_confidence
+        self.breakers = {b.name: CircuitBreaker(breaker_failures, breaker_reset) for b in self.backends}
+        self.latency = {b.name: LatencyTracker() for b in self.backends}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(2, 2 * len(self.backends)), thread_name_prefix="vocalshell-asr"
+        )
+
+    def healthy(self):
+        return [b for b in self.backends if self.breakers[b.name].state != "open"]
+
+    def begin(self):
+        return Utterance(self)
+
+    def transcribe(self, pcm):
+        utterance = self.begin()
+        utterance.feed(pcm)
+        return utterance.finish()
+
+    def stats(self):
+        return {
+            b.name: dict(self.latency[b.name].stats(), state=self.breakers[b.name].state)
+            for b in self.backends
+        }
+
+    def _finish(self, backend, decoder, audio):
+        """Run one backend to completion, recording latency and health."""
+        start = time.monotonic()
+        try:
+            if decoder is None:
+                decoder = backend.decoder()
+                decoder.feed(audio)
+            text, confidence = decoder.finish()
+        except Exception as e:
+            self.latency[backend.name].record(time.monotonic() - start, ok=False)
+            self.breakers[backend.name].record_failure()
+            logger.warning(f"Recognizer {backend.name} failed: {e}")
+            raise
+        finally:
+            if decoder is not None:
+                decoder.close()
+        latency = time.monotonic() - start
+        self.latency[backend.name].record(latency)
+        if backend.timeout and latency > backend.timeout:
+            # Answered, but too late to be used
+            self.breakers[backend.name].record_failure()
+        else:
+            self.breakers[backend.name].record_success()
+        return Transcript(text, confidence, backend.name, latency)
+
+    def confident(self, transcript):
+        return bool(transcript.text) and transcript.confidence >= self.min_confidence
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class Utterance:
+    """Audio for one phrase on its way through a ``RecognizerRouter``.
+
+    Backends that decode incrementally are fed as frames arrive (all of
+    them when racing, only the first in fallback mode); the rest get the
+    buffered audio when ``finish()`` is called.
+    """
+
+    def __init__(self, router):
+        self.router = router
+        self.audio = bytearray()
+        self.live = {}
+        if router.mode == "race":
+            self.candidates = [b for b in router.backends if router.breakers[b.name].allow()]
+            self.admitted = {b.name for b in self.candidates}
+            streamed = self.candidates
+        else:
+            # Breakers are asked only for a backend about to be used, so a
+            # half-open one's single trial isn't spent on an utterance the
+            # backend ahead of it answers
+            self.candidates = list(router.backends)
+            self.admitted = set()
+            streamed = []
+            for backend in self.candidates:
+                if router.breakers[backend.name].allow():
+                    self.admitted.add(backend.name)
+                    streamed = [backend]
+                    break
+        for backend in streamed:
+            if type(backend).decoder is RecognizerBackend.decoder:
+                continue
+            try:
+                self.live[backend.name] = backend.decoder()
+            except Exception as e:
+                logger.warning(f"Recognizer {backend.name} unavailable: {e}")
+
+    def feed(self, frame):
+        self.audio += frame
+        for decoder in self.live.values():
+            decoder.feed(frame)
+
+    def finish(self):
+        if not self.audio:
+            self.close()
+            return EMPTY
+        if self.router.mode == "race":
+            return self._race()
+        return self._fallback()
+
+    def _submit(self, backend):
+        return self.router._executor.submit(
+            self.router._finish, backend, self.live.pop(backend.name, None), bytes(self.audio)
+        )
+
+    def _fallback(self):
+        best = EMPTY
+        try:
+            for backend in self.candidates:
+                if backend.name not in self.admitted and not self.router.breakers[backend.name].allow():
+                    continue
+                self.admitted.add(backend.name)
+                future = self._submit(backend)
+                try:
+                    result = future.result(timeout=backend.timeout)
+                except Exception:
+                    if not future.done():
+                        # Left to finish in the background; it counts as a failure there
+                        logger.warning(f"Recognizer {backend.name} timed out after {backend.timeout}s")
+                    continue
+                if self.router.confident(result):
+                    return result
+                if result.confidence >= best.confidence and result.text:
+                    best = result
+            return best
+        finally:
+            self.close()
+
+    def _race(self):
+        futures = {self._submit(b): b for b in self.candidates}
+        timeouts = [b.timeout for b in self.candidates if b.timeout]
+        deadline = time.monotonic() + max(timeouts) if timeouts else None
+        best = EMPTY
+        pending = set(futures)
+        while pending:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is not None:
+                    continue
+                result = future.result()
+                if self.router.confident(result):
+                    # The slower backends keep running; their results only feed the stats
+                    return result
+                if result.text and result.confidence >= best.confidence:
+                    best = result
+        return best
+
+    def close(self):
+        for decoder in self.live.values():
+            decoder.close()
+        self.live.clear()
+
+
+def build_router(config, pool=None, recognizer=None, use_online=False):
+    """Build the router described by the ``speech`` config section.
+
+    ``recognizer_backends`` lists backend names in preference order; by
+    default that is ``["google", "vosk"]`` when ``use_online`` is set and
+    ``["vosk"]`` otherwise.
+    """
+    config = config or {}
+    names = config.get("recognizer_backends") or (["google", "vosk"] if use_online else ["vosk"])
+    timeouts = config.get("recognizer_timeouts", {})
+    backends = []
+    for name in names:
+        if name == "vosk":
+            backends.append(VoskBackend(pool, timeouts.get("vosk"), config.get("recognizer_timeout", DEFAULT_RECOGNIZER_TIMEOUT)))
+        elif name == "google":
+            if recognizer is None:
+                import speech_recognition as sr
+
+                recognizer = sr.Recognizer()
+            backends.append(GoogleBackend(recognizer, config.get("language", "en-US"), timeouts.get("google", 5.0)))
+        elif name == "stub":
+            backends.append(StubBackend(config.get("stub_text", "")))
+        else:
+            raise ValueError(f"Unknown recognizer backend: {name}")
+    return RecognizerRouter(
+        backends,
+        mode=config.get("recognizer_mode", "fallback"),
+        min_confidence=config.get("min_confidence", 0.5),
+        breaker_failures=config.get("breaker_failures", 3),
+        breaker_reset=config.get("breaker_reset", 30.0),
+    )
@@ -0,0 +1,121 @@
+import os
+import stat
+import shlex
+import logging
+import platform
+import subprocess
+import tempfile
+
+from vocalshell.session import resolve_cd_target
+
+logger = logging.getLogger(__name__)
+
+
+class ScriptCompiler:
+    """Turns a sequence of parsed commands into one ``.sh`` or ``.bat`` script.
+
+    Commands come from the platform templates in ``commands_config.json``
+    (via ``NLPCommandParser``). ``cd`` targets go through the executor's
+    folder aliases ("cd downloads" becomes the home Downloads folder), so
+    the script does what running the commands step by step would have.
+    Running it costs one shell launch instead of one per command.
+    """
+
+    def __init__(self, is_windows=None, stop_on_error=True):
+        self.is_windows = platform.system() == "Windows" if is_windows is None else is_windows
+        self.stop_on_error = stop_on_error
+
+    @property
+    def extension(self):
+        return ".bat" if self.is_windows else ".sh"
+
+    def _resolve_cd(self, command):
+        if not command.lower().startswith("cd "):
+            return command
+        path = command[3:].strip()
+        if self.is_windows and path.lower().startswith("/d "):
+            path = path[3:].strip()
+        target = resolve_cd_target(path, self.is_windows)
+        if target == path:
+            # Left to the shell, which may expand ~ or variables in it
+            return command
+        return f'cd /d "{target}"' if self.is_windows else f"cd {shlex.quote(target)}"
+
+    def compile(self, commands):
+        lines = ["@echo off"] if self.is_windows else ["#!/bin/sh"]
+        if self.stop_on_error and not self.is_windows:
+            lines.append("set -e")
+
+        for command in commands:
+            command = command.strip()
+            if not command:
+                continue
+            lines.append(self._resolve_cd(command))
+            if self.stop_on_error and self.is_windows:
+                lines.append("if errorlevel 1 exit /b %errorlevel%")
+
+        newline = "\r\n" if self.is_windows else "\n"
+        return newline.join(lines) + newline
+
+    def compile_utterances(self, parser, texts):
+        """Parse ``texts`` and compile the result.
+
+        Returns ``(script, skipped)`` where ``skipped`` lists the utterances
+        that did not resolve to a complete command.
+        """
+        commands, skipped = [], []
+        for text, (command, params, description, metadata) in zip(texts, parser.parse_many(texts)):
+            if command is None or not command.strip():
+                skipped.append(text)
+            else:
+                commands.append(command)
+        return self.compile(commands), skipped
+
+    def write(self, script, path):
+        if not os.path.splitext(path)[1]:
+            path += self.extension
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", newline="") as f:
+            f.write(script)
+        if not self.is_windows:
+            mode = os.stat(path).st_mode
+            os.chmod(path, mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+        return path
+
+    def run(self, script, session=None, timeout=300):
+        """Run the whole script as a single subprocess in ``session``'s cwd.
+
+        A ``cd`` inside the script only lasts for the script; the session's
+        own directory is left unchanged.
+        """
+        cwd = session.cwd if session else None
+        env = session.env if session else None
+        path = None
+        try:
+            if self.is_windows:
+                # cmd.exe can't read a batch script from stdin
+                fd, path = tempfile.mkstemp(suffix=".bat")
+                with os.fdopen(fd, "w", newline="") as f:
+                    f.write(script)
+                result = subprocess.run(
+                    ["cmd", "/c", path], capture_output=True, text=True,
+                    timeout=timeout, cwd=cwd, env=env
+                )
+            else:
+                result = subprocess.run(
+                    ["/bin/sh", "-s"], input=script, capture_output=True, text=True,
+                    timeout=timeout, cwd=cwd, env=env
+                )
+        except Exception as e:
+            return False, str(e)
+        finally:
+            if path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        output = "\n".join(part for part in (result.stdout.strip(), result.stderr.strip()) if part)
+        if result.returncode == 0:
+            return True, output or "Script executed successfully"
+        return False, output or f"Script failed with exit code {result.returncode}"
@@ -0,0 +1,128 @@
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+_ENV_VAR = re.compile(r"\$(\w+)|\$\{(\w+)\}|%(\w+)%")
+
+
+def resolve_cd_target(path, is_windows=False, home=None):
+    """Map the spoken folder names desktop/documents/downloads/pictures to
+    the user's own folders; any other ``path`` is returned unchanged.
+
+    ``home`` is the session's home directory, the process's by default.
+    On Windows the OneDrive copy is preferred where OneDrive redirects it.
+    """
+    from pathlib import Path
+
+    home = Path(home) if home else Path.home()
+    name = path.strip().lower()
+    if name not in ("desktop", "documents", "downloads", "pictures"):
+        return path
+    folder = name.capitalize()
+    if is_windows and name != "downloads" and (home / "OneDrive" / folder).exists():
+        return str(home / "OneDrive" / folder)
+    return str(home / folder)
+
+
+class Session:
+    """Working directory and environment for one client.
+
+    Commands run with ``cwd=session.cwd`` and ``env=session.env`` so that a
+    ``cd`` or ``export`` from one client never leaks into another.
+    """
+
+    def __init__(self, session_id=None, cwd=None, env=None):
+        self.id = session_id or uuid.uuid4().hex
+        self.cwd = os.path.abspath(cwd or os.getcwd())
+        self.env = dict(os.environ if env is None else env)
+        self.env["PWD"] = self.cwd
+        self.last_used = time.monotonic()
+
+    def expand(self, path):
+        """Expand ``~`` and ``$VAR``/``${VAR}``/``%VAR%`` from this session's
+        environment, so an ``export`` made by this client is honoured.
+
+        Unknown variables are left as written, as ``os.path.expandvars`` does.
+        """
+        if path == "~" or path.startswith(("~/", "~" + os.sep)):
+            home = self.env.get("HOME") or self.env.get("USERPROFILE")
+            path = (home or os.path.expanduser("~")) + path[1:]
+
+        def lookup(match):
+            name = next(group for group in match.groups() if group)
+            return self.env.get(name, match.group(0))
+
+        return _ENV_VAR.sub(lookup, path)
+
+    def resolve(self, path):
+        """Resolve ``path`` against this session's directory, not the process cwd."""
+        path = self.expand(path.strip().strip('"'))
+        return os.path.normpath(os.path.join(self.cwd, path))
+
+    def chdir(self, path):
+        target = self.resolve(path)
+        if not os.path.isdir(target):
+            raise FileNotFoundError(f"No such directory: {path}")
+        self.cwd = target
+        self.env["PWD"] = target
+        return target
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+
+class SessionStore:
+    """Bounded map of session id -> ``Session``.
+
+    Sessions idle for longer than ``idle_timeout`` seconds are dropped, and
+    once ``max_sessions`` is reached the least recently used one is evicted.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or {}
+        self.max_sessions = self.config.get("max_sessions", 256)
+        self.idle_timeout = self.config.get("session_idle_timeout", 3600)
+        self.default_cwd = self.config.get("session_cwd")
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id=None):
+        """Return the session for ``session_id``, creating it if unknown.
+
+        Without an id every call gets a fresh, unregistered session.
+        """
+        if not session_id:
+            return Session(cwd=self.default_cwd)
+
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id, cwd=self.default_cwd)
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            session.touch()
+            return session
+
+    def drop(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _expire(self):
+        if not self.idle_timeout:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_used >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self._sessions)
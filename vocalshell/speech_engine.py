@@ -1,30 +1,311 @@
 import speech_recognition as sr
+import json
 import logging
-from vocalshell.audio_utils import AudioPlayer
+from vocalshell.audio_utils import AudioPlayer, PcmConverter, open_wav_stream
+from vocalshell.model_registry import (
+    get_model_registry, DEFAULT_MODEL_PATH, DEFAULT_SAMPLE_RATE, DEFAULT_RECOGNIZER_TIMEOUT
+)
+from vocalshell.vad import Endpointer, FRAME_MS, frame_stream, make_vad, rms
+from vocalshell.capture import MicrophoneCapture
+from vocalshell.provisioning import is_model_dir
+from vocalshell.recognizers import VoskBackend, build_router
+from vocalshell.vosk_grammar import DecodingGrammar
 
 logger = logging.getLogger(__name__)
 
+# 0.25 s of 16 kHz audio per AcceptWaveform call
+CHUNK_FRAMES = 4000
+
+
+def transcribe_wav(source, pool, chunk_frames=CHUNK_FRAMES, timeout=None):
+    """Stream WAV audio through a pooled recognizer.
+
+    ``source`` may be in-memory bytes/memoryview, a path, or a binary file
+    object; PCM frames are fed to the decoder chunk by chunk.
+    """
+    info, chunks = open_wav_stream(source, chunk_frames)
+    converter = PcmConverter(
+        info.sample_rate, info.sample_width, info.channels, pool.sample_rate
+    )
+    segments = []
+    with pool.recognizer(timeout) as rec:
+        for data in chunks:
+            # Vosk emits a finished segment whenever it detects an endpoint
+            if rec.AcceptWaveform(converter.convert(data)):
+                segments.append(json.loads(rec.Result()).get("text", ""))
+        segments.append(json.loads(rec.FinalResult()).get("text", ""))
+    return " ".join(s for s in segments if s).strip()
+
+
+class StreamingSession:
+    """Incremental recognition over raw 16-bit mono PCM pushed by a live client.
+
+    Holds one pooled recognizer for its lifetime; call ``close()`` to return it.
+    """
+
+    def __init__(self, pool, sample_rate=DEFAULT_SAMPLE_RATE, timeout=None):
+        self.pool = pool
+        self.converter = PcmConverter(sample_rate, 2, 1, pool.sample_rate)
+        self.rec = pool.acquire(timeout)
+        self._last_partial = ""
+
+    def feed(self, data):
+        """Feed one chunk and return ``("final", text)`` at an endpoint,
+        ``("partial", text)`` when the partial hypothesis changed, else None."""
+        if self.rec.AcceptWaveform(self.converter.convert(data)):
+            self._last_partial = ""
+            return "final", json.loads(self.rec.Result()).get("text", "")
+
+        partial = json.loads(self.rec.PartialResult()).get("partial", "")
+        if partial == self._last_partial:
+            return None
+        self._last_partial = partial
+        return "partial", partial
+
+    def finish(self):
+        self._last_partial = ""
+        return json.loads(self.rec.FinalResult()).get("text", "")
+
+    def close(self):
+        if self.rec is not None:
+            self.pool.release(self.rec)
+            self.rec = None
+
+
 class SpeechRecognizer:
-    def __init__(self, model_path=None, use_online=False, config=None):
+    """Microphone capture plus offline (Vosk) or online (Google) recognition.
+
+    ``voice_settings`` is the ``speech_recognition`` section of
+    ``voice_settings.json``. The microphone is opened on the first
+    ``listen()`` and kept open; ambient noise is measured once at that
+    point, and with ``dynamic_energy_threshold`` the threshold keeps
+    adapting during the silence before each phrase.
+
+    Captured audio goes through a voice activity detector (``speech.vad``)
+    and an ``Endpointer``: leading and trailing silence never reach the
+    decoder, and the phrase ends as soon as the speaker stops. Which
+    engines decode it is up to ``self.router`` (see ``recognizers.py``);
+    Vosk is fed while the user is still talking.
+
+    While text-to-speech is playing the microphone hears the speaker, so
+    those frames are never decoded. Only a voice ``barge_in_ratio`` times
+    louder than the playback level measured meanwhile counts as barge-in;
+    decoding then starts with the frames after playback stopped (and
+    ``echo_tail_ms`` of room echo).
+
+    With ``sounddevice`` available (and ``speech.continuous_capture`` on)
+    the microphone is recorded all the time into a ring buffer, so words
+    spoken while a command runs are picked up by the next ``listen()``.
+    """
+
+    def __init__(self, model_path=None, use_online=False, config=None, voice_settings=None):
         self.recognizer = sr.Recognizer()
         self.microphone = sr.Microphone()
         self.use_online = use_online
+        self.config = config or {}
+        self.voice_settings = voice_settings or {}
+        self.vad = make_vad(
+            self.config,
+            threshold=self.voice_settings.get("energy_threshold", 300),
+            dynamic=self.voice_settings.get("dynamic_energy_threshold", True)
+        )
+        self.timeout = self.voice_settings.get("timeout", 5)
+        self.phrase_time_limit = self.voice_settings.get("phrase_time_limit", 10)
+        self.calibration_duration = self.voice_settings.get("calibration_duration", 1.0)
+        self.barge_in_ratio = self.config.get("barge_in_ratio", 3.0)
+        self.echo_tail_frames = self.config.get("echo_tail_ms", 250) // FRAME_MS
+        self._source = None
+        self._converter = None
+        self._ignore_frames = 0
+        self.capture = None
+        self.model_path = model_path or DEFAULT_MODEL_PATH
+        self.models = get_model_registry()
+        self.pool = self.models.get_pool(
+            self.model_path,
+            DEFAULT_SAMPLE_RATE,
+            self.config.get("recognizer_pool_size", 4)
+        )
+        self.router = build_router(self.config, self.pool, self.recognizer, use_online)
+
+    def warmup(self):
+        """Load the offline model up front instead of on the first utterance.
 
-    def listen(self):
+        Done whenever a Vosk backend is routed to, also as the fallback
+        behind Google, so the first online failure doesn't pay the load.
+        """
+        paths = [b.pool.model_path for b in self.router.backends if isinstance(b, VoskBackend)]
+        if not paths:
+            return False
+        grammar_path = self._grammar_model_path() if self.config.get("grammar_decoding") else None
+        if grammar_path:
+            paths.append(grammar_path)
+        return bool(self.models.warmup(paths, prefetch=self.config.get("prefetch_model", False)))
+
+    def use_command_grammar(self, parser, cwd):
+        """Restrict Vosk to phrases from ``parser``'s patterns and the entries
+        of the directory ``cwd()`` returns, when ``speech.grammar_decoding``
+        is on. The phrase list follows config reloads and directory changes.
+        """
+        if not self.config.get("grammar_decoding"):
+            return False
+        grammar = DecodingGrammar(parser, cwd, self.config.get("grammar_max_entries", 200))
+        backends = [b for b in self.router.backends if isinstance(b, VoskBackend)]
+        for backend in backends:
+            backend.use_grammar(grammar, self._grammar_model_path())
+        return bool(backends)
+
+    def _grammar_model_path(self):
+        # The small grammar model is optional: until it is unpacked the
+        # grammar runs on the backend's own model instead
+        path = self.config.get("grammar_model_path")
+        if path and not is_model_dir(path):
+            logger.warning(f"Grammar model {path} is not ready; using the main model for grammar decoding")
+            return None
+        return path
+
+    def transcribe_audio(self, source):
         try:
-            with self.microphone as source:
-                self.recognizer.adjust_for_ambient_noise(source)
-                audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=10)
-            if self.use_online:
-                return self.recognizer.recognize_google(audio)
-            else:
-                from vosk import Model, KaldiRecognizer
-                import json
-                model = Model("models/vosk-model-en-us-0.22")
-                rec = KaldiRecognizer(model, 16000)
-                rec.AcceptWaveform(audio.get_raw_data(convert_rate=16000, convert_width=2))
-                result = json.loads(rec.Result())
-                return result.get("text", "")
+            return transcribe_wav(
+                source,
+                self.pool,
+                self.config.get("chunk_frames", CHUNK_FRAMES),
+                self.config.get("recognizer_timeout", DEFAULT_RECOGNIZER_TIMEOUT)
+            )
         except Exception as e:
+            logger.error(f"Audio transcription failed: {e}")
+            return ""
+
+    def open_stream(self, sample_rate=DEFAULT_SAMPLE_RATE):
+        return StreamingSession(self.pool, sample_rate, self.config.get("recognizer_timeout", DEFAULT_RECOGNIZER_TIMEOUT))
+
+    def open(self):
+        """Open the microphone stream and calibrate; later calls reuse it."""
+        if self._source is None and self.capture is None:
+            if self.config.get("continuous_capture", True) and MicrophoneCapture.available():
+                try:
+                    self.capture = MicrophoneCapture(
+                        self.config.get("ring_seconds", 30), DEFAULT_SAMPLE_RATE
+                    ).start()
+                except Exception as e:
+                    logger.warning(f"Continuous capture unavailable, recording per phrase: {e}")
+                    self.capture = None
+            if self.capture is None:
+                self._source = self.microphone.__enter__()
+                self._converter = PcmConverter(
+                    self._source.SAMPLE_RATE, self._source.SAMPLE_WIDTH, 1, DEFAULT_SAMPLE_RATE
+                )
+            # A fixed threshold from voice_settings.json is used as given
+            if self.vad.dynamic:
+                count = max(1, int(self.calibration_duration * 1000) // FRAME_MS)
+                frames = self._frames()
+                self.vad.calibrate(next(frames) for _ in range(count))
+                logger.info(f"Calibrated energy threshold: {self.vad.threshold:.0f}")
+        return self.capture or self._source
+
+    def _frames(self):
+        """16 kHz mono frames from the open microphone, forever."""
+        source = self.open()
+        if source is self.capture:
+            return self.capture.frames()
+
+        def chunks():
+            while True:
+                yield self._converter.convert(source.stream.read(source.CHUNK))
+
+        return frame_stream(chunks())
+
+    def ignore(self, seconds):
+        """Never decode the next ``seconds`` of microphone audio (plus the
+        echo tail), e.g. a cue that was just started on the speaker."""
+        if not seconds:
+            return
+        seconds += self.echo_tail_frames * FRAME_MS / 1000
+        if self.open() is self.capture:
+            self.capture.mute(seconds)
+        else:
+            self._ignore_frames = int(seconds * 1000) // FRAME_MS
+
+    def _utterance(self, on_speech=None, speaking=None):
+        """Yield the voiced frames of the next phrase as they are captured."""
+        endpointer = Endpointer.from_config(
+            self.vad, self.config, self.timeout, self.phrase_time_limit
+        )
+        if self.open() is self.capture:
+            # Whatever was recorded while the last command ran: keep it only
+            # if someone spoke, else start near the live edge
+            skipped = self.capture.skip_idle(
+                self.vad.is_speech, endpointer.pre_roll, endpointer.start_frames
+            )
+            if skipped:
+                logger.debug(f"Skipped {skipped * FRAME_MS} ms of buffered silence")
+        echo = None
+        loud = tail = 0
+        for frame in self._frames():
+            if self._ignore_frames:
+                self._ignore_frames -= 1
+                continue
+            if speaking is not None and speaking():
+                # Our own speech coming back through the microphone: only
+                # track its level and listen for a clearly louder voice
+                energy = rms(frame)
+                if echo is not None and energy > max(self.vad.threshold, echo * self.barge_in_ratio):
+                    loud += 1
+                    if loud >= endpointer.start_frames and on_speech is not None:
+                        on_speech()
+                else:
+                    loud = 0
+                    echo = energy if echo is None else echo * 0.9 + energy * 0.1
+                tail = self.echo_tail_frames
+                continue
+            if tail:
+                tail -= 1
+                continue
+            frames = endpointer.feed(frame)
+            if frames and on_speech is not None and endpointer.frames_kept == len(frames):
+                # Speech just started
+                on_speech()
+            for voiced in frames:
+                yield voiced
+            if endpointer.done:
+                break
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.stop()
+            self.capture = None
+        if self._source is not None:
+            self._source = None
+            try:
+                self.microphone.__exit__(None, None, None)
+            except Exception as e:
+                logger.debug(f"Closing microphone failed: {e}")
+
+    def listen(self, on_speech=None, speaking=None):
+        """Record one phrase and transcribe it.
+
+        ``on_speech`` is called the moment speech starts, e.g. to cut off
+        text-to-speech (barge-in). ``speaking()`` tells whether our own
+        text-to-speech is playing; audio captured meanwhile is not decoded.
+        """
+        utterance = self.router.begin()
+        try:
+            for frame in self._utterance(on_speech, speaking):
+                utterance.feed(frame)
+            result = utterance.finish()
+            if result.backend:
+                logger.debug(f"Recognized by {result.backend} in {result.latency * 1000:.0f} ms")
+            return result.text
+        except OSError as e:
+            # The device went away; reopen (and recalibrate) next time
+            self.close()
             logger.error(f"Speech recognition failed: {e}")
             return ""
+        except Exception as e:
+            logger.error(f"Speech recognition failed: {e}")
+            return ""
+        finally:
+            utterance.close()
+
+    def recognizer_stats(self):
+        """Per-backend latency percentiles, error counts and breaker state."""
+        return self.router.stats()
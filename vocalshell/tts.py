@@ -0,0 +1,174 @@
+import re
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"[.!?](?=\s)")
+
+
+def summarize(text, max_chars=400, max_lines=5):
+    """Shorten ``text`` to something worth listening to.
+
+    Keeps the first ``max_lines`` non-empty lines and cuts at the last
+    sentence (or word) boundary before ``max_chars``, then says how much
+    was left out.
+    """
+    lines = [line.strip() for line in (text or "").splitlines() if line.strip()]
+    if not lines:
+        return ""
+    skipped = 0
+    if max_lines and len(lines) > max_lines:
+        skipped = len(lines) - max_lines
+        lines = lines[:max_lines]
+    spoken = ". ".join(line.rstrip(".") for line in lines) if len(lines) > 1 else lines[0]
+
+    if max_chars and len(spoken) > max_chars:
+        cut = spoken[:max_chars]
+        ends = [m.end() for m in _SENTENCE_END.finditer(cut)]
+        if ends and ends[-1] > max_chars // 2:
+            cut = cut[:ends[-1]]
+        elif " " in cut:
+            cut = cut[:cut.rindex(" ")]
+        return f"{cut.rstrip(' ,;:')}... output truncated."
+    if skipped:
+        return f"{spoken}. And {skipped} more line{'s' if skipped != 1 else ''}."
+    return spoken
+
+
+class SpeechWorker:
+    """Speaks text on a background thread so the caller never waits for it.
+
+    The pyttsx3 engine is created and driven on the worker thread only,
+    since its drivers are not safe to share between threads. At most
+    ``max_queue`` utterances wait; when full, the oldest is dropped.
+    ``interrupt()`` discards everything queued and cuts the current
+    utterance off at the next word (barge-in).
+    """
+
+    def __init__(self, rate=150, volume=1.0, voice=None, max_queue=4, max_chars=400, max_lines=5):
+        self.rate = rate
+        self.volume = volume
+        self.voice = voice
+        self.max_chars = max_chars
+        self.max_lines = max_lines
+        self._queue = queue.Queue(maxsize=max(1, max_queue))
+        # Bumped by interrupt(); anything queued or playing under an older
+        # generation is skipped or cut off
+        self._generation = 0
+        self._current = 0
+        self._playing = False
+        self._idle = threading.Event()
+        self._idle.set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._engine = None
+        self.available = True
+
+    @classmethod
+    def from_config(cls, config=None):
+        config = config or {}
+        return cls(
+            rate=config.get("tts_rate", 150),
+            volume=config.get("tts_volume", 1.0),
+            voice=config.get("tts_voice"),
+            max_queue=config.get("tts_queue_size", 4),
+            max_chars=config.get("tts_max_chars", 400),
+            max_lines=config.get("tts_max_lines", 5),
+        )
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="vocalshell-tts", daemon=True)
+                self._thread.start()
+        return self
+
+    def say(self, text):
+        """Queue ``text`` (summarized) and return immediately."""
+        if not self.available:
+            return False
+        text = summarize(text, self.max_chars, self.max_lines)
+        if not text:
+            return False
+        self.start()
+        self._idle.clear()
+        while True:
+            try:
+                self._queue.put_nowait((self._generation, text))
+                return True
+            except queue.Full:
+                try:
+                    _, dropped = self._queue.get_nowait()
+                    logger.debug(f"TTS queue full, dropping: {dropped[:40]!r}")
+                except queue.Empty:
+                    pass
+
+    def interrupt(self):
+        """Drop queued speech and stop the current utterance."""
+        self._generation += 1
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        if not self._playing:
+            self._idle.set()
+
+    @property
+    def speaking(self):
+        return not self._idle.is_set()
+
+    def wait(self, timeout=None):
+        """Block until everything queued has been spoken."""
+        return self._idle.wait(timeout)
+
+    def stop(self):
+        self.interrupt()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _init_engine(self):
+        # Imported here so a missing pyttsx3 only disables speech output
+        import pyttsx3
+
+        engine = pyttsx3.init()
+        engine.setProperty("rate", self.rate)
+        engine.setProperty("volume", self.volume)
+        if self.voice:
+            engine.setProperty("voice", self.voice)
+        # Checked between words, from inside the engine's own loop
+        engine.connect("started-word", self._on_word)
+        return engine
+
+    def _on_word(self, name, location, length):
+        if self._current != self._generation:
+            self._engine.stop()
+
+    def _run(self):
+        try:
+            self._engine = self._init_engine()
+        except Exception as e:
+            logger.warning(f"Text-to-speech unavailable: {e}")
+            self.available = False
+            self._engine = None
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            self._current, text = item
+            if self._engine is not None and self._current == self._generation:
+                self._playing = True
+                try:
+                    self._engine.say(text)
+                    self._engine.runAndWait()
+                except Exception as e:
+                    logger.error(f"Text-to-speech failed: {e}")
+                finally:
+                    self._playing = False
+            if self._queue.empty():
+                self._idle.set()
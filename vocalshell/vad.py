@@ -0,0 +1,184 @@
+import math
+import logging
+from array import array
+
+try:
+    import audioop
+except ImportError:  # Python 3.13+ without the audioop-lts backport
+    audioop = None
+
+try:
+    import webrtcvad
+except ImportError:
+    webrtcvad = None
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+# webrtcvad only accepts 10, 20 or 30 ms frames
+FRAME_MS = 30
+FRAME_BYTES = SAMPLE_RATE * FRAME_MS // 1000 * 2
+
+
+def rms(frame):
+    """Root-mean-square level of 16-bit mono PCM."""
+    if audioop is not None:
+        return audioop.rms(frame, 2)
+    samples = array("h", bytes(frame))
+    if not samples:
+        return 0
+    return int(math.sqrt(sum(s * s for s in samples) / len(samples)))
+
+
+class EnergyVAD:
+    """Classifies a frame as speech when its RMS level is above a threshold.
+
+    With ``dynamic`` set, the threshold follows the background level the
+    same way ``speech_recognition`` does: on frames known to be silence it
+    moves towards ``ratio`` times their energy, damped per second by
+    ``damping``.
+    """
+
+    def __init__(self, threshold=300, dynamic=True, damping=0.15, ratio=1.5):
+        self.threshold = threshold
+        self.dynamic = dynamic
+        self.damping = damping
+        self.ratio = ratio
+
+    def adapt(self, energy, seconds=FRAME_MS / 1000):
+        damping = self.damping ** seconds
+        self.threshold = self.threshold * damping + energy * self.ratio * (1 - damping)
+
+    def calibrate(self, frames):
+        """Set the threshold from frames of background noise."""
+        for frame in frames:
+            self.adapt(rms(frame))
+        return self.threshold
+
+    def is_speech(self, frame, adapt=False):
+        energy = rms(frame)
+        if energy > self.threshold:
+            return True
+        if adapt and self.dynamic:
+            self.adapt(energy)
+        return False
+
+
+class WebRTCVAD(EnergyVAD):
+    """WebRTC's GMM frame classifier, gated by the energy threshold.
+
+    ``aggressiveness`` runs from 0 (keeps most audio) to 3 (drops the
+    most). The energy gate keeps quiet background chatter from counting.
+    """
+
+    def __init__(self, aggressiveness=2, **kwargs):
+        super().__init__(**kwargs)
+        self._vad = webrtcvad.Vad(aggressiveness)
+
+    def is_speech(self, frame, adapt=False):
+        if not super().is_speech(frame, adapt):
+            return False
+        return self._vad.is_speech(bytes(frame), SAMPLE_RATE)
+
+
+def make_vad(config=None, threshold=300, dynamic=True):
+    """``speech.vad`` picks ``"webrtc"`` or ``"energy"`` (the default)."""
+    config = config or {}
+    if config.get("vad", "energy") == "webrtc":
+        if webrtcvad is not None:
+            return WebRTCVAD(config.get("vad_aggressiveness", 2), threshold=threshold, dynamic=dynamic)
+        logger.warning("webrtcvad is not installed, using the energy VAD")
+    return EnergyVAD(threshold, dynamic)
+
+
+class Endpointer:
+    """Finds one utterance in a stream of fixed-size frames.
+
+    ``feed()`` returns the frames that belong to the utterance as soon as
+    that is known: nothing during leading silence, the ``pre_roll`` frames
+    plus the current one once ``start_frames`` voiced frames in a row mark
+    the start, and pauses inside the utterance only once speech resumes.
+    The utterance ends after ``end_frames`` of silence (only ``pad_frames``
+    of it are kept), after ``max_frames`` in total, or, if speech never
+    starts, after ``wait_frames``.
+    """
+
+    def __init__(self, vad, start_frames=3, end_frames=20, pad_frames=5, pre_roll=10,
+                 max_frames=None, wait_frames=None):
+        self.vad = vad
+        self.start_frames = start_frames
+        self.end_frames = end_frames
+        self.pad_frames = pad_frames
+        self.pre_roll = pre_roll
+        self.max_frames = max_frames
+        self.wait_frames = wait_frames
+        self.started = False
+        self.done = False
+        self.frames_seen = 0
+        self.frames_kept = 0
+        self._before = []
+        self._voiced_run = 0
+        self._silence = []
+
+    @classmethod
+    def from_config(cls, vad, config=None, timeout=None, phrase_time_limit=None):
+        config = config or {}
+
+        def frames(ms):
+            return max(1, int(ms) // FRAME_MS)
+
+        return cls(
+            vad,
+            start_frames=frames(config.get("vad_start_ms", 90)),
+            end_frames=frames(config.get("vad_end_silence_ms", 600)),
+            pad_frames=frames(config.get("vad_pad_ms", 150)),
+            pre_roll=frames(config.get("pre_roll_ms", 300)),
+            max_frames=frames(phrase_time_limit * 1000) if phrase_time_limit else None,
+            wait_frames=frames(timeout * 1000) if timeout else None,
+        )
+
+    def feed(self, frame):
+        if self.done:
+            return []
+        self.frames_seen += 1
+        voiced = self.vad.is_speech(frame, adapt=not self.started)
+
+        if not self.started:
+            self._before.append(frame)
+            self._voiced_run = self._voiced_run + 1 if voiced else 0
+            if self._voiced_run >= self.start_frames:
+                self.started = True
+                out = self._before[-(self.pre_roll + self._voiced_run):]
+                self._before = []
+                return self._keep(out)
+            del self._before[:-(self.pre_roll + self.start_frames)]
+            if self.wait_frames and self.frames_seen >= self.wait_frames:
+                self.done = True
+            return []
+
+        if voiced:
+            out = self._silence + [frame]
+            self._silence = []
+            return self._keep(out)
+        self._silence.append(frame)
+        if len(self._silence) >= self.end_frames:
+            self.done = True
+            return self._keep(self._silence[:self.pad_frames])
+        return []
+
+    def _keep(self, frames):
+        if self.max_frames and self.frames_kept + len(frames) >= self.max_frames:
+            frames = frames[:self.max_frames - self.frames_kept]
+            self.done = True
+        self.frames_kept += len(frames)
+        return frames
+
+
+def frame_stream(chunks, frame_bytes=FRAME_BYTES):
+    """Re-cut a stream of PCM chunks of any size into ``frame_bytes`` frames."""
+    pending = bytearray()
+    for chunk in chunks:
+        pending += chunk
+        while len(pending) >= frame_bytes:
+            yield bytes(pending[:frame_bytes])
+            del pending[:frame_bytes]
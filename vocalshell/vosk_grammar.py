@@ -0,0 +1,90 @@
+import os
+import re
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Spoken commands handled outside commands_config.json (main.py and the
+# repeat-from-history phrases in nlp_parser.py)
+BUILTIN_PHRASES = [
+    "exit", "quit", "stop",
+    "start script", "record script", "begin script", "run script", "execute script",
+    "save script as", "cancel script", "discard script",
+    "repeat last", "repeat that", "again", "repeat command number", "repeat the command",
+    "do what i did yesterday", "from today", "with the", "yes", "no",
+    "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten", "zero",
+]
+
+_WORDS = re.compile(r"[a-z]+")
+
+
+def spoken_name(entry):
+    """'Quarterly_Report-2024.txt' -> 'quarterly report'."""
+    stem = os.path.splitext(entry)[0] if not entry.startswith(".") else entry
+    return " ".join(_WORDS.findall(stem.lower()))
+
+
+def build_phrases(grammar, entries=(), extra=BUILTIN_PHRASES):
+    """Phrase list for a Vosk grammar recognizer.
+
+    Every pattern contributes its literal words ("copy file (.*) to (.*)"
+    gives "copy file to"), every directory entry its spoken name. Vosk
+    builds a small language model over these, so a command word followed
+    by a file name is still recognized. "[unk]" absorbs anything else.
+    """
+    phrases = set(extra)
+    for rule in grammar.rules:
+        if rule.literals:
+            phrases.add(" ".join(rule.literals))
+    for entry in entries:
+        name = spoken_name(entry)
+        if name:
+            phrases.add(name)
+    return sorted(phrases) + ["[unk]"]
+
+
+class DecodingGrammar:
+    """Keeps a Vosk phrase list in step with the parser and a directory.
+
+    ``current()`` is cheap when nothing changed: it compares the parser's
+    compiled grammar by identity (a reload swaps it) and the directory by
+    path and mtime (adding or removing entries bumps it).
+    """
+
+    def __init__(self, parser, cwd=os.getcwd, max_entries=200, extra=BUILTIN_PHRASES):
+        self.parser = parser
+        self.cwd = cwd
+        self.max_entries = max_entries
+        self.extra = list(extra)
+        self.version = 0
+        self._key = None
+        self._json = None
+
+    def _directory_key(self):
+        path = self.cwd()
+        try:
+            return path, os.stat(path).st_mtime_ns
+        except OSError:
+            return path, None
+
+    def _entries(self, path):
+        try:
+            with os.scandir(path) as it:
+                names = [entry.name for entry in it]
+        except OSError:
+            return []
+        return sorted(names)[:self.max_entries]
+
+    def current(self):
+        """Return ``(version, grammar_json)``, rebuilding if out of date."""
+        grammar = self.parser.grammar
+        # CompiledGrammar compares by identity, so a reload always differs
+        key = (grammar, self._directory_key())
+        if key != self._key:
+            phrases = build_phrases(grammar, self._entries(key[1][0]), self.extra)
+            self._json = json.dumps(phrases)
+            self._key = key
+            self.version += 1
+            logger.debug(f"Rebuilt decoding grammar: {len(phrases)} phrases")
+        return self.version, self._json
@@ -0,0 +1,186 @@
+import os
+import sys
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+from vocalshell.memory import format_bytes, process_memory
+from vocalshell.model_registry import get_model_registry, DEFAULT_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+
+class ServerBusy(Exception):
+    """Raised when a request arrives while the admission queue is full."""
+
+
+# -------------------------------------------------------------------------
+# DECODER PROCESS STATE
+# -------------------------------------------------------------------------
+_decoder_pool = None
+_decoder_config = {}
+
+
+def _init_decoder(model_path, speech_config, pids=None):
+    # Runs once in each decoder process: load the model before the first job.
+    # A forked child that inherited the parent's model skips the load.
+    global _decoder_pool, _decoder_config
+    if pids is not None:
+        pids.put(os.getpid())
+    _decoder_config = speech_config or {}
+    registry = get_model_registry()
+    inherited = registry.is_loaded(model_path)
+    _decoder_pool = registry.get_pool(model_path, DEFAULT_SAMPLE_RATE, 1)
+    registry.warmup([model_path])
+    memory = process_memory()
+    logger.info(
+        f"Decoder {os.getpid()} ready ({'shared' if inherited else 'own'} model), "
+        f"RSS {format_bytes(memory.get('rss', 0))}, PSS {format_bytes(memory.get('pss', 0))}"
+    )
+
+
+def _ping():
+    return os.getpid()
+
+
+def _decode_in_worker(data):
+    from vocalshell.speech_engine import transcribe_wav, CHUNK_FRAMES
+
+    try:
+        return transcribe_wav(data, _decoder_pool, _decoder_config.get("chunk_frames", CHUNK_FRAMES))
+    except Exception as e:
+        logger.error(f"Audio transcription failed: {e}")
+        return ""
+
+
+class WorkerPools:
+    """Executors that keep blocking speech and shell work off the event loop.
+
+    Uploaded audio is decoded in a process pool (``decode_workers``; 0 decodes
+    on the command threads instead) and parse/execute runs on a bounded thread
+    pool (``exec_workers``). Requests beyond ``exec_workers + max_queue`` are
+    refused with ``ServerBusy`` rather than queued indefinitely. Streaming
+    voice connections have a separate limit, ``max_streams``, so that
+    long-lived sockets cannot use up the slots of short HTTP requests.
+
+    On Linux the decoder processes are forked, so a model the parent loaded
+    first (see ``start_decoders``) is shared with them copy-on-write instead
+    of being loaded again in each one. Elsewhere the platform's default
+    start method is used, as forking a threaded process is unsafe on macOS.
+    """
+
+    def __init__(self, config=None, model_path=None, speech_config=None):
+        self.config = config or {}
+        self.model_path = model_path
+        self.speech_config = speech_config
+        self.decode_workers = self.config.get("decode_workers", 2)
+        self.exec_workers = self.config.get("exec_workers", 4)
+        self.max_pending = self.exec_workers + self.config.get("max_queue", 16)
+        self._pending = 0
+        self.max_streams = self.config.get("max_streams", 8)
+        self._streams = 0
+
+        self._decoder_pids = set()
+        self._pid_queue = None
+
+        self.exec_pool = ThreadPoolExecutor(
+            max_workers=self.exec_workers, thread_name_prefix="vocalshell-exec"
+        )
+        self.decode_pool = self._make_decode_pool() if self.decode_workers > 0 else None
+
+    def _make_decode_pool(self):
+        if sys.platform.startswith("linux"):
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context()
+        # Each decoder reports its pid here as it starts, for memory()
+        self._decoder_pids.clear()
+        self._pid_queue = context.SimpleQueue()
+        return ProcessPoolExecutor(
+            max_workers=self.decode_workers,
+            mp_context=context,
+            initializer=_init_decoder,
+            initargs=(self.model_path, self.speech_config, self._pid_queue),
+        )
+
+    @contextmanager
+    def admission(self):
+        # Only ever touched from the event loop thread, so no lock is needed
+        if self._pending >= self.max_pending:
+            raise ServerBusy(f"Server busy: {self._pending} requests in progress")
+        self._pending += 1
+        try:
+            yield
+        finally:
+            self._pending -= 1
+
+    @contextmanager
+    def stream_admission(self):
+        # Held for the life of a streaming connection; event loop thread only
+        if self._streams >= self.max_streams:
+            raise ServerBusy(f"Server busy: {self._streams} voice streams open")
+        self._streams += 1
+        try:
+            yield
+        finally:
+            self._streams -= 1
+
+    def start_decoders(self, wait=True):
+        """Start the decoder processes now; returns their pids.
+
+        Call after the parent has loaded the model: the processes are
+        forked from that state and begin with the model already in memory.
+        The fork happens on the calling thread, so call this from the
+        main (event loop) thread. With ``wait`` False the futures are
+        returned instead of waiting for the processes to come up.
+        """
+        if self.decode_pool is None:
+            return []
+        futures = [self.decode_pool.submit(_ping) for _ in range(self.decode_workers)]
+        if not wait:
+            return futures
+        return sorted({f.result() for f in futures})
+
+    def memory(self):
+        """Memory of this process and each decoder process."""
+        report = [dict(process_memory(), role="server")]
+        if self._pid_queue is not None:
+            while not self._pid_queue.empty():
+                self._decoder_pids.add(self._pid_queue.get())
+        for pid in sorted(self._decoder_pids):
+            report.append(dict(process_memory(pid), role="decoder"))
+        return report
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.exec_pool, func, *args)
+
+    async def decode(self, data, fallback=None):
+        """Transcribe WAV bytes in a decoder process.
+
+        File objects, or any source when no process pool is configured, are
+        handed to ``fallback`` on the command threads instead. If a decoder
+        process dies the pool is replaced and this request falls back too.
+        """
+        pool = self.decode_pool
+        if pool is None or not isinstance(data, bytes):
+            return await self.run(fallback, data)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool, _decode_in_worker, data)
+        except BrokenProcessPool:
+            # Requests in flight all see the same broken pool; replace it once
+            if self.decode_pool is pool:
+                logger.error("Decoder process died; starting a new decoder pool")
+                pool.shutdown(wait=False, cancel_futures=True)
+                self.decode_pool = self._make_decode_pool()
+                self.start_decoders(wait=False)
+            return await self.run(fallback, data)
+
+    def shutdown(self):
+        self.exec_pool.shutdown(wait=False, cancel_futures=True)
+        if self.decode_pool is not None:
+            self.decode_pool.shutdown(wait=False, cancel_futures=True)